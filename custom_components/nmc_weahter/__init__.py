@@ -1,16 +1,100 @@
 import logging
+import time
+import voluptuous as vol
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform, CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry, SOURCE_IMPORT
+from homeassistant.const import Platform, CONF_LATITUDE, CONF_LONGITUDE, CONF_NAME
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN
+from .const import DOMAIN, CONF_IMAGES, CONF_STATION_CODE
 
-from .nmc import NMCDataUpdateCoordinator
+from .nmc import NMCDataUpdateCoordinator, STORAGE_VERSION, storage_key
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.WEATHER, Platform.IMAGE]
+PLATFORMS = [Platform.WEATHER, Platform.IMAGE, Platform.SENSOR]
+
+SERVICE_PROFILE_REFRESH = "profile_refresh"
+ATTR_ENTRY_ID = "entry_id"
+PROFILE_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTRY_ID): cv.string})
+
+# 批量部署：按地区编码或坐标（需要站点坐标表）自动添加站点
+STATION_SCHEMA = vol.Any(
+    vol.Schema({
+        vol.Required(CONF_STATION_CODE): cv.string,
+        vol.Optional(CONF_NAME): cv.string,
+        vol.Optional(CONF_IMAGES): vol.All(cv.ensure_list, [cv.string]),
+    }),
+    vol.Schema({
+        vol.Required(CONF_LATITUDE): cv.latitude,
+        vol.Required(CONF_LONGITUDE): cv.longitude,
+        vol.Optional(CONF_NAME): cv.string,
+        vol.Optional(CONF_IMAGES): vol.All(cv.ensure_list, [cv.string]),
+    }),
+)
+
+CONFIG_SCHEMA = vol.Schema(
+    {DOMAIN: vol.All(cv.ensure_list, [STATION_SCHEMA])}, extra=vol.ALLOW_EXTRA)
+
+
+async def async_setup(hass: HomeAssistant, config) -> bool:
+    for station in config.get(DOMAIN, []):
+        hass.async_create_task(hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": SOURCE_IMPORT}, data=station))
+
+    async def async_profile_refresh(call: ServiceCall):
+        coordinators = hass.data.get(DOMAIN, {})
+        if (entry_id := call.data.get(ATTR_ENTRY_ID)) is not None:
+            if entry_id not in coordinators:
+                raise ServiceValidationError(f"{entry_id} is not a loaded {DOMAIN} entry")
+            coordinators = {entry_id: coordinators[entry_id]}
+        # 同一时间只能有一个分析器，逐个站点进行
+        for coordinator in coordinators.values():
+            await _async_profile_refresh(hass, coordinator)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE_REFRESH, async_profile_refresh, schema=PROFILE_SCHEMA)
+    return True
+
+
+async def _async_profile_refresh(hass: HomeAssistant, coordinator):
+    """Run one full refresh under cProfile and write the stats to the config dir.
+
+    Every product is made due and its validators are forgotten first, so the
+    refresh fetches and parses all of them instead of hitting the caches.
+    The profiler sees everything running on the event loop meanwhile; the
+    hourly page parse runs in the executor and is profiled separately, then
+    merged. The output is meant to be opened with pstats or snakeviz.
+    """
+    import cProfile
+    import io
+    import pstats
+
+    path = hass.config.path(
+        f"{DOMAIN}.{coordinator.station_code}.{int(time.time())}.cprof")
+    profiler = cProfile.Profile()
+    executor_profiler = coordinator.executor_profiler = cProfile.Profile()
+    coordinator.async_expire()
+    profiler.enable()
+    try:
+        await coordinator.async_refresh()
+    finally:
+        profiler.disable()
+        coordinator.executor_profiler = None
+
+    def dump():
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.add(executor_profiler)
+        stats.dump_stats(path)
+        stats.sort_stats("cumulative").print_stats(20)
+        return summary.getvalue()
+
+    summary = await hass.async_add_executor_job(dump)
+    _LOGGER.info("profile of %s written to %s\n%s", coordinator.station_code, path, summary)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -19,9 +103,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     coordinator = NMCDataUpdateCoordinator(
         hass, name=entry.data[CONF_NAME], config=entry.data)
 
-    await coordinator.async_config_entry_first_refresh()
+    # 有缓存时先以缓存数据启动，稍后错开刷新
+    if not await coordinator.async_restore():
+        await coordinator.async_config_entry_first_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    coordinator.async_schedule_refresh()
+    await coordinator.hub.async_update_image_cache(hass.data[DOMAIN].values())
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
@@ -33,6 +121,15 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     unload_ok = await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
     )
-    hass.data[DOMAIN].pop(config_entry.entry_id)
+    coordinator = hass.data[DOMAIN].pop(config_entry.entry_id)
+    coordinator.hub.alerts.async_remove_station(coordinator.station_code)
+    # 取消尚未发出的合并通知
+    await coordinator.async_shutdown()
+    await coordinator.hub.async_update_image_cache(hass.data[DOMAIN].values())
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached data of a deleted entry."""
+    await Store(hass, STORAGE_VERSION, storage_key(entry.data[CONF_STATION_CODE])).async_remove()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import EVENT_ALERT
+
+_LOGGER = logging.getLogger(__name__)
+
+# nmc.cn 用 9999 表示没有预警
+NO_ALERT = "9999"
+LEVELS = ("白色", "蓝色", "黄色", "橙色", "红色")
+_ISSUE_TIME = re.compile(r"_(\d{14})")
+
+ACTION_NEW = "new"
+ACTION_UPGRADED = "upgraded"
+ACTION_DOWNGRADED = "downgraded"
+ACTION_UPDATED = "updated"
+ACTION_CANCELLED = "cancelled"
+
+
+def _text(value):
+    return None if value in (None, "", NO_ALERT, int(NO_ALERT)) else value
+
+
+@dataclass(slots=True, frozen=True)
+class Alert:
+    """One warning signal as found in real.warn of /rest/weather."""
+
+    id: str
+    title: str
+    type: str | None
+    level: str | None
+    issue_time: datetime | None
+    province: str | None
+    city: str | None
+    content: str | None
+    url: str | None
+
+    @property
+    def region(self):
+        return self.province, self.city
+
+    @property
+    def rank(self) -> int:
+        return LEVELS.index(self.level) if self.level in LEVELS else -1
+
+    @classmethod
+    def from_json(cls, warn) -> Alert | None:
+        if not warn or (title := _text(warn.get("alert"))) is None:
+            return None
+        url = _text(warn.get("url"))
+        issue_time = None
+        if url and (match := _ISSUE_TIME.search(url)):
+            issue_time = datetime.strptime(match.group(1), "%Y%m%d%H%M%S")
+        return cls(
+            # 预警页面地址包含地区编码和发布时间，可以唯一标识一条预警
+            id=url.rsplit("/", 1)[-1].split(".")[0] if url else title,
+            title=title,
+            type=_text(warn.get("signaltype")),
+            level=_text(warn.get("signallevel")),
+            issue_time=issue_time,
+            province=_text(warn.get("province")),
+            city=_text(warn.get("city")),
+            content=_text(warn.get("issuecontent")),
+            url=url,
+        )
+
+    @classmethod
+    def from_dict(cls, data) -> Alert:
+        issue_time = data["issue_time"]
+        if isinstance(issue_time, str):
+            issue_time = datetime.fromisoformat(issue_time)
+        return cls(**{**data, "issue_time": issue_time})
+
+
+class AlertIndex:
+    """Active alerts of all stations, deduplicated by alert id.
+
+    Stations in the same region report the same alert, so events are fired
+    once per alert rather than once per station: when an id is first seen,
+    when a new id replaces one of the same region and type (upgraded,
+    downgraded or updated at the same level, with the replaced level as
+    previous_level), and when no station reports an alert any more without
+    it being replaced.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._alerts: dict[str, Alert] = {}
+        self._stations: dict[str, str | None] = {}
+        self._by_region: dict[tuple, str] = {}
+
+    @property
+    def active(self) -> list[Alert]:
+        return list(self._alerts.values())
+
+    @callback
+    def async_update(self, station_code, alert: Alert | None, fire=True):
+        """Record the alert a station reports now; fire=False only seeds the index."""
+        previous_id = self._stations.get(station_code)
+        self._stations[station_code] = alert.id if alert is not None else None
+        if alert is not None and alert.id == previous_id:
+            return
+
+        if alert is not None and alert.id not in self._alerts:
+            self._alerts[alert.id] = alert
+            key = (alert.region, alert.type)
+            replaced = self._alerts.get(self._by_region.get(key))
+            if (replaced is not None and alert.issue_time and replaced.issue_time
+                    and alert.issue_time < replaced.issue_time):
+                # 站点数据滞后，仍是已被替换的旧预警
+                del self._alerts[alert.id]
+                return
+            self._by_region[key] = alert.id
+            if replaced is not None:
+                # 同一地区同类预警被新预警替换，旧预警不再单独报解除
+                self._forget(replaced.id)
+                if fire:
+                    if alert.rank > replaced.rank:
+                        action = ACTION_UPGRADED
+                    elif alert.rank < replaced.rank:
+                        action = ACTION_DOWNGRADED
+                    else:
+                        action = ACTION_UPDATED
+                    self._fire(action, alert, station_code, replaced)
+            elif fire:
+                self._fire(ACTION_NEW, alert, station_code)
+
+        if previous_id is not None and previous_id in self._alerts \
+                and previous_id not in self._stations.values():
+            cancelled = self._alerts[previous_id]
+            self._forget(previous_id)
+            if fire:
+                self._fire(ACTION_CANCELLED, cancelled, station_code)
+
+    @callback
+    def async_remove_station(self, station_code):
+        """Drop a station without treating its alert as cancelled."""
+        previous_id = self._stations.pop(station_code, None)
+        if previous_id is not None and previous_id not in self._stations.values():
+            self._forget(previous_id)
+
+    def _forget(self, alert_id):
+        if (alert := self._alerts.pop(alert_id, None)) is None:
+            return
+        key = (alert.region, alert.type)
+        if self._by_region.get(key) == alert_id:
+            del self._by_region[key]
+        for station_code, reported in self._stations.items():
+            if reported == alert_id:
+                self._stations[station_code] = None
+
+    def _fire(self, action, alert: Alert, station_code, previous: Alert | None = None):
+        _LOGGER.debug("alert %s %s", action, alert.title)
+        self.hass.bus.async_fire(EVENT_ALERT, {
+            "action": action,
+            "id": alert.id,
+            "title": alert.title,
+            "type": alert.type,
+            "level": alert.level,
+            "previous_level": previous.level if previous is not None else None,
+            "issue_time": alert.issue_time.isoformat() if alert.issue_time else None,
+            "province": alert.province,
+            "city": alert.city,
+            "content": alert.content,
+            "url": alert.url,
+            "station_code": station_code,
+        })
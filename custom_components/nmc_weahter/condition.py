@@ -0,0 +1,87 @@
+import logging
+import re
+from functools import lru_cache
+
+from homeassistant.components.weather import (
+    ATTR_CONDITION_HAIL,
+    ATTR_CONDITION_CLOUDY,
+    ATTR_CONDITION_FOG,
+    ATTR_CONDITION_LIGHTNING_RAINY,
+    ATTR_CONDITION_PARTLYCLOUDY,
+    ATTR_CONDITION_RAINY,
+    ATTR_CONDITION_SNOWY,
+    ATTR_CONDITION_SNOWY_RAINY,
+    ATTR_CONDITION_SUNNY,
+    ATTR_CONDITION_WINDY,
+    ATTR_CONDITION_POURING,
+    ATTR_CONDITION_EXCEPTIONAL
+)
+
+CONDITION_MAP = {
+    '晴': ATTR_CONDITION_SUNNY,
+    '多云': ATTR_CONDITION_CLOUDY,
+    '局部多云': ATTR_CONDITION_PARTLYCLOUDY,
+    '阴': ATTR_CONDITION_CLOUDY,
+    '雾': ATTR_CONDITION_FOG,
+    '中雾': ATTR_CONDITION_FOG,
+    '大雾': ATTR_CONDITION_FOG,
+    '小雨': ATTR_CONDITION_RAINY,
+    '中雨': ATTR_CONDITION_RAINY,
+    '小到中雨': ATTR_CONDITION_RAINY,
+    '阵雨': ATTR_CONDITION_RAINY,
+    '大雨': ATTR_CONDITION_POURING,
+    '暴雨': ATTR_CONDITION_POURING,
+    '小雪': ATTR_CONDITION_SNOWY,
+    '中雪': ATTR_CONDITION_SNOWY,
+    '大雪': ATTR_CONDITION_SNOWY,
+    '暴雪': ATTR_CONDITION_SNOWY,
+    '扬沙': ATTR_CONDITION_FOG,
+    '沙尘': ATTR_CONDITION_FOG,
+    '雷阵雨': ATTR_CONDITION_LIGHTNING_RAINY,
+    '冰雹': ATTR_CONDITION_HAIL,
+    '雨夹雪': ATTR_CONDITION_SNOWY_RAINY,
+    '大风': ATTR_CONDITION_WINDY,
+    '薄雾': ATTR_CONDITION_FOG,
+    '雨': ATTR_CONDITION_RAINY,
+    '雪': ATTR_CONDITION_SNOWY,
+    '9999': ATTR_CONDITION_EXCEPTIONAL,
+
+}
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# 未精确匹配时按关键词判断，越靠前优先级越高
+CONDITION_KEYWORDS = [
+    ('中雨', ATTR_CONDITION_RAINY),
+    ('暴雨', ATTR_CONDITION_POURING),
+    ('雨', ATTR_CONDITION_RAINY),
+    ('雪', ATTR_CONDITION_SNOWY),
+    ('沙', ATTR_CONDITION_FOG),
+    ('云', ATTR_CONDITION_CLOUDY),
+    ('雾', ATTR_CONDITION_FOG),
+]
+
+# 所有关键词编译成一个表达式，一次扫描找出全部命中
+_KEYWORD_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword, _ in CONDITION_KEYWORDS))
+_KEYWORD_PRIORITY = {keyword: (priority, c) for priority, (keyword, c)
+                     in enumerate(CONDITION_KEYWORDS)}
+
+_unknown_conditions = set()
+
+
+@lru_cache(maxsize=256)
+def condition_map(condition):
+    if (c := CONDITION_MAP.get(condition)) is not None:
+        return c
+    hits = [_KEYWORD_PRIORITY[keyword]
+            for keyword in _KEYWORD_PATTERN.findall(condition)]
+    if hits:
+        return min(hits)[1]
+
+    # 同一个未知天气只记录一次
+    if condition not in _unknown_conditions:
+        _unknown_conditions.add(condition)
+        _LOGGER.warning("unknown condition: %s", condition)
+    return ATTR_CONDITION_EXCEPTIONAL
@@ -1,23 +1,34 @@
 from __future__ import annotations
 import logging
-import requests
-import json
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 from homeassistant import config_entries
-from homeassistant.const import CONF_NAME
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, CONF_NAME, CONF_ZONE
 from homeassistant.core import callback
 
 from .const import (
+    CONF_NEAREST,
     CONF_PROVINCE,
+    CONF_SEARCH,
     CONF_STATION_CODE,
     CONF_IMAGES,
+    CONF_IMAGE_DISK_CACHE,
     CONF_IMAGE_RADAR,
     CONF_IMAGE_PRECIPITATION24,
     CONF_IMAGE_MAX_TEMPERATURE24,
     CONF_IMAGE_TEMPERATURE_HOURLY,
+    CONF_IMAGE_RADAR_LOOP,
+    CONF_MAX_CONCURRENCY,
+    CONF_REQUEST_TIMEOUT,
+    CONF_RADAR_FRAMES,
+    CONF_RADAR_MAX_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RADAR_FRAMES,
+    DEFAULT_RADAR_MAX_SIZE,
     DOMAIN
 )
+from .directory import async_get_directory
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,7 +36,8 @@ IMAGES = {
     CONF_IMAGE_RADAR: "雷达图",
     CONF_IMAGE_PRECIPITATION24: "24小时降雨量预报图",
     CONF_IMAGE_MAX_TEMPERATURE24: "24小时最高气温预报图",
-    CONF_IMAGE_TEMPERATURE_HOURLY: "气温实况图"
+    CONF_IMAGE_TEMPERATURE_HOURLY: "气温实况图",
+    CONF_IMAGE_RADAR_LOOP: "雷达动画"
 }
 
 
@@ -36,25 +48,111 @@ class NMCWeatherFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     async def async_step_user(self, user_input=None):
         errors = {}
 
-        if user_input is not None:
-            self._province = user_input[CONF_PROVINCE]
-            return await self.async_step_city()
-
         try:
-            request_provinces = await self.hass.async_add_executor_job(
-                requests.get, "http://www.nmc.cn/rest/province/all"
-            )
-            self._provinces = {p['code']: p['name']
-                               for p in json.loads(request_provinces.content)}
+            self._directory = async_get_directory(self.hass)
+            provinces = await self._directory.async_get_provinces()
         except Exception:
             _LOGGER.exception("fetch provinces failed")
             return await self.async_step_manual()
 
+        if user_input is not None:
+            if user_input.get(CONF_NEAREST):
+                return await self.async_step_nearest()
+            if query := user_input.get(CONF_SEARCH, "").strip():
+                self._query = query
+                return await self.async_step_search()
+            if CONF_PROVINCE in user_input:
+                self._province = user_input[CONF_PROVINCE]
+                return await self.async_step_city()
+            errors["base"] = "province_or_search"
+
+        schema = {
+            vol.Optional(CONF_PROVINCE): vol.In(provinces),
+            vol.Optional(CONF_SEARCH): str
+        }
+        # 只有提供了站点坐标表才能按位置查找
+        if await self._directory.async_get_locator() is not None:
+            schema[vol.Optional(CONF_NEAREST, default=False)] = bool
+
         return self.async_show_form(
             step_id="user",
+            data_schema=vol.Schema(schema),
+            errors=errors,
+        )
+
+    async def async_step_nearest(self, user_input=None):
+        zones = {state.entity_id: state.name
+                 for state in self.hass.states.async_all("zone")}
+
+        if user_input is not None:
+            zone = self.hass.states.get(user_input[CONF_ZONE])
+            if zone is None:
+                latitude, longitude = self.hass.config.latitude, self.hass.config.longitude
+            else:
+                latitude, longitude = zone.attributes[CONF_LATITUDE], zone.attributes[CONF_LONGITUDE]
+            location = await self._directory.async_nearest(latitude, longitude)
+            if location is None:
+                return self.async_abort(reason="no_station_table")
+            return await self._async_select_station({
+                CONF_STATION_CODE: location.code,
+                **({CONF_NAME: location.name} if location.name else {}),
+                **({CONF_IMAGES: user_input[CONF_IMAGES]} if CONF_IMAGES in user_input else {}),
+            })
+
+        return self.async_show_form(
+            step_id="nearest",
             data_schema=vol.Schema(
                     {
-                        vol.Required(CONF_PROVINCE): vol.In(self._provinces)
+                        vol.Required(CONF_ZONE, default="zone.home"): vol.In(zones or {"zone.home": "Home"}),
+                        vol.Optional(CONF_IMAGES): cv.multi_select(IMAGES)
+                    }
+            ),
+        )
+
+    async def async_step_import(self, import_config):
+        """Create an entry from YAML, a station code or coordinates to resolve."""
+        config = dict(import_config)
+        self._directory = async_get_directory(self.hass)
+        if CONF_STATION_CODE not in config:
+            location = await self._directory.async_nearest(
+                config.pop(CONF_LATITUDE), config.pop(CONF_LONGITUDE))
+            if location is None:
+                return self.async_abort(reason="no_station_table")
+            config[CONF_STATION_CODE] = location.code
+            if location.name and CONF_NAME not in config:
+                config[CONF_NAME] = location.name
+        return await self._async_select_station(config)
+
+    async def async_step_search(self, user_input=None):
+        errors = {}
+
+        if user_input is not None:
+            if CONF_STATION_CODE in user_input:
+                return await self._async_select_station(user_input)
+            # 没有结果时表单只有搜索框，重新搜索
+            self._query = user_input.get(CONF_SEARCH, "").strip()
+
+        await self._directory.async_load_all()
+        stations = {s.code: f"{s.name} ({s.code})"
+                    for s in self._directory.search(self._query)}
+        if not stations:
+            return self.async_show_form(
+                step_id="search",
+                data_schema=vol.Schema(
+                        {
+                            vol.Required(CONF_SEARCH, default=self._query): str
+                        }
+                ),
+                errors={"base": "no_results"},
+            )
+
+        return self.async_show_form(
+            step_id="search",
+            data_schema=vol.Schema(
+                    {
+                        vol.Required(CONF_STATION_CODE): vol.In(stations),
+                        vol.Optional(CONF_NAME): str,
+                        vol.Optional(CONF_IMAGES): cv.multi_select(IMAGES)
                     }
             ),
             errors=errors,
@@ -64,21 +162,11 @@ class NMCWeatherFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
-            if user_input.get(CONF_NAME) is None:
-                user_input[CONF_NAME] = f"{user_input[CONF_STATION_CODE]}"
-                for city in self._cities:
-                    if city['code'] == user_input[CONF_STATION_CODE]:
-                        user_input[CONF_NAME] = f"{city['province']}{city['city']}"
-                        break
-            self.config = user_input
-            return await self.async_setup_station()
+            return await self._async_select_station(user_input)
 
         try:
-            request_city = await self.hass.async_add_executor_job(
-                requests.get, f"http://www.nmc.cn/rest/province/{self._province}"
-            )
-            self._cities = json.loads(request_city.content)
-            stations = {city['code']: city['city'] for city in self._cities}
+            cities = await self._directory.async_get_stations(self._province)
+            stations = {city.code: city.city for city in cities}
         except Exception:
             _LOGGER.exception("fetch cities failed")
             return await self.async_step_manual()
@@ -95,6 +183,13 @@ class NMCWeatherFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def _async_select_station(self, user_input):
+        if user_input.get(CONF_NAME) is None:
+            station = self._directory.get(user_input[CONF_STATION_CODE])
+            user_input[CONF_NAME] = station.name if station else f"{user_input[CONF_STATION_CODE]}"
+        self.config = user_input
+        return await self.async_setup_station()
+
     async def async_step_manual(self, user_input=None):
         """Handle a flow initialized by the user."""
         errors = {}
@@ -154,7 +249,27 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             step_id="init",
             data_schema=vol.Schema(
                     {
-                        vol.Optional(CONF_IMAGES, default=self.config.get(CONF_IMAGES, [])): cv.multi_select(IMAGES)
+                        vol.Optional(CONF_IMAGES, default=self.config.get(CONF_IMAGES, [])): cv.multi_select(IMAGES),
+                        vol.Optional(
+                            CONF_MAX_CONCURRENCY,
+                            default=self.config.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+                        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                        vol.Optional(
+                            CONF_REQUEST_TIMEOUT,
+                            default=self.config.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
+                        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+                        vol.Optional(
+                            CONF_RADAR_FRAMES,
+                            default=self.config.get(CONF_RADAR_FRAMES, DEFAULT_RADAR_FRAMES)
+                        ): vol.All(vol.Coerce(int), vol.Range(min=2, max=60)),
+                        vol.Optional(
+                            CONF_RADAR_MAX_SIZE,
+                            default=self.config.get(CONF_RADAR_MAX_SIZE, DEFAULT_RADAR_MAX_SIZE)
+                        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=256)),
+                        vol.Optional(
+                            CONF_IMAGE_DISK_CACHE,
+                            default=self.config.get(CONF_IMAGE_DISK_CACHE, False)
+                        ): bool
                     }
             ),
         )
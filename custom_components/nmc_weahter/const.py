@@ -3,19 +3,47 @@ from typing import Final
 DOMAIN: Final = "nmc_weather"
 MANUFACTURER: Final = "www.nmc.cn"
 NAME: Final = "NMC Weahter"
+# 所有请求都以此为基础地址
+BASE_URL: Final = "http://www.nmc.cn"
 
 CONF_STATION_CODE = "station_code"
 CONF_PROVINCE = "province"
 CONF_CITY = "city"
+CONF_SEARCH = "search"
+CONF_NEAREST = "nearest"
+
+# 用户提供的站点坐标表，放在配置目录下
+STATIONS_FILE = "nmc_stations.csv"
 
 CONF_IMAGES = "images"
 CONF_IMAGE_PRECIPITATION24 = "precipitation24"
 CONF_IMAGE_MAX_TEMPERATURE24 = "max-temperature24"
 CONF_IMAGE_RADAR = "radar"
 CONF_IMAGE_TEMPERATURE_HOURLY = "temperature-hourly"
+CONF_IMAGE_RADAR_LOOP = "radar-loop"
+
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_REQUEST_TIMEOUT = "request_timeout"
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUEST_TIMEOUT = 10
+
+CONF_IMAGE_DISK_CACHE = "image_disk_cache"
+
+CONF_RADAR_FRAMES = "radar_frames"
+CONF_RADAR_MAX_SIZE = "radar_max_size"
+
+DEFAULT_RADAR_FRAMES = 10
+# MB
+DEFAULT_RADAR_MAX_SIZE = 16
 
 DATA_FORECAST = "forecast"
 DATA_FORECAST_HOURLY = "forecast-hourly"
+DATA_FORECAST_DAILY = "forecast-daily"
+DATA_FORECAST_TWICE_DAILY = "forecast-twice-daily"
+DATA_NOWCAST = "nowcast"
+
+EVENT_ALERT = "nmc_weather_alert"
 DATA_PRECIPITATION24 = "precipitation24"
 DATA_MAX_TEMPERATURE24 = "max-temperature24"
 DATA_TEMPERATURE_HOURLY = "temperature-hourly"
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    hub = coordinator.hub
+    return {
+        "config": dict(entry.data),
+        "refresh_interval": str(coordinator.refresh_interval),
+        "last_update_success": coordinator.last_update_success,
+        "generation": coordinator.generation,
+        "stats": coordinator.stats.as_dict(),
+        "image_cache": hub.image_cache.as_dict(),
+        "active_alerts": [alert.title for alert in hub.alerts.active],
+        "circuit_breakers": {host: breaker.is_open for host, breaker in hub.breakers.items()},
+    }
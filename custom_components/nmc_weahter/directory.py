@@ -0,0 +1,217 @@
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from .const import BASE_URL, DOMAIN, DEFAULT_REQUEST_TIMEOUT, STATIONS_FILE
+from .locate import StationLocation, StationLocator, load_stations
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_DIRECTORY = "nmc_weather_directory"
+
+STORAGE_KEY = f"{DOMAIN}.stations"
+STORAGE_VERSION = 1
+# 站点列表很少变化，缓存一周
+REFRESH_INTERVAL = 7 * 24 * 3600
+FETCH_CONCURRENCY = 4
+
+
+@dataclass(slots=True, frozen=True)
+class Station:
+    code: str
+    province: str
+    city: str
+
+    @property
+    def name(self):
+        return f"{self.province}{self.city}"
+
+
+class StationDirectory:
+    """Persisted index of nmc.cn provinces and stations shared by all flows.
+
+    Provinces and their stations are fetched on first use with the shared
+    aiohttp session, stored on disk and refreshed when older than a week.
+    Stations are indexed by province, code and city name for lookups and
+    search.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.session = async_get_clientsession(hass)
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self.provinces: dict[str, str] = {}
+        self._provinces_updated = 0.0
+        self._by_province: dict[str, tuple[Station, ...]] = {}
+        self._province_updated: dict[str, float] = {}
+        self._by_code: dict[str, Station] = {}
+        self._by_city: dict[str, list[Station]] = {}
+        self._locator: StationLocator | None = None
+
+    async def _async_load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not (stored := await self._store.async_load()):
+            return
+        self.provinces = stored["provinces"]
+        self._provinces_updated = stored["provinces_updated"]
+        for province_code, entry in stored["stations"].items():
+            self._index(province_code, [Station(**s) for s in entry["stations"]],
+                        entry["updated"])
+
+    def _data_to_store(self):
+        return {
+            "provinces": self.provinces,
+            "provinces_updated": self._provinces_updated,
+            "stations": {
+                province_code: {
+                    "updated": self._province_updated[province_code],
+                    "stations": [asdict(s) for s in stations],
+                }
+                for province_code, stations in self._by_province.items()
+            },
+        }
+
+    def _index(self, province_code, stations, updated):
+        for station in self._by_province.get(province_code, ()):
+            self._by_code.pop(station.code, None)
+            if (same_city := self._by_city.get(station.city)) is not None:
+                same_city[:] = [s for s in same_city if s.code != station.code]
+        self._by_province[province_code] = tuple(stations)
+        self._province_updated[province_code] = updated
+        for station in stations:
+            self._by_code[station.code] = station
+            self._by_city.setdefault(station.city, []).append(station)
+
+    async def _async_fetch_json(self, path):
+        async with asyncio.timeout(DEFAULT_REQUEST_TIMEOUT):
+            async with self.session.get(f"{BASE_URL}{path}") as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def async_get_provinces(self) -> dict[str, str]:
+        async with self._lock:
+            await self._async_load()
+            if self.provinces and time.time() - self._provinces_updated < REFRESH_INTERVAL:
+                return self.provinces
+            try:
+                provinces = await self._async_fetch_json("/rest/province/all")
+            except Exception:
+                # 有旧数据时继续使用
+                if not self.provinces:
+                    raise
+                _LOGGER.warning("refresh provinces failed, use cached list")
+                return self.provinces
+            self.provinces = {p['code']: p['name'] for p in provinces}
+            self._provinces_updated = time.time()
+            self._store.async_delay_save(self._data_to_store, 1)
+            return self.provinces
+
+    async def async_get_stations(self, province_code) -> tuple[Station, ...]:
+        async with self._lock:
+            await self._async_load()
+            return await self._async_get_stations(province_code)
+
+    async def _async_get_stations(self, province_code):
+        stations = self._by_province.get(province_code)
+        if stations is not None and time.time() - self._province_updated[province_code] < REFRESH_INTERVAL:
+            return stations
+        try:
+            cities = await self._async_fetch_json(f"/rest/province/{province_code}")
+        except Exception:
+            if stations is None:
+                raise
+            _LOGGER.warning("refresh stations of %s failed, use cached list", province_code)
+            return stations
+        self._index(province_code, [
+            Station(code=c['code'], province=c['province'], city=c['city'])
+            for c in cities
+        ], time.time())
+        self._store.async_delay_save(self._data_to_store, 1)
+        return self._by_province[province_code]
+
+    async def async_load_all(self):
+        """Make sure every province is indexed, needed before searching."""
+        provinces = await self.async_get_provinces()
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def load(province_code):
+            async with semaphore:
+                try:
+                    await self.async_get_stations(province_code)
+                except Exception as err:
+                    _LOGGER.warning("fetch stations of %s failed: %r", province_code, err)
+
+        await asyncio.gather(*(load(code) for code in provinces))
+
+    async def async_get_locator(self) -> StationLocator | None:
+        """Spatial index of the user provided station table, None without one."""
+        if self._locator is None:
+            path = self.hass.config.path(STATIONS_FILE)
+
+            def load():
+                if not os.path.isfile(path):
+                    return None
+                return StationLocator(load_stations(path))
+
+            self._locator = await self.hass.async_add_executor_job(load)
+            if self._locator is not None:
+                _LOGGER.debug("loaded %d station locations from %s", len(self._locator), path)
+        return self._locator
+
+    async def async_nearest(self, latitude, longitude) -> StationLocation | None:
+        if (locator := await self.async_get_locator()) is None:
+            return None
+        nearest = locator.nearest(latitude, longitude)
+        return nearest[0][0] if nearest else None
+
+    def get(self, code) -> Station | None:
+        return self._by_code.get(code)
+
+    def search(self, query, limit=20) -> list[Station]:
+        """Match by station code or city name: exact, prefix, substring, then fuzzy."""
+        query = query.strip()
+        if not query:
+            return []
+        if (station := self._by_code.get(query)) is not None:
+            return [station]
+
+        results = list(self._by_city.get(query, []))
+        seen = {s.code for s in results}
+        ranked = [[], []]
+        for city, stations in self._by_city.items():
+            if not stations:
+                continue
+            if city.startswith(query):
+                ranked[0].extend(stations)
+            elif query in city or query in stations[0].name:
+                ranked[1].extend(stations)
+        for stations in ranked:
+            for station in stations:
+                if station.code not in seen:
+                    seen.add(station.code)
+                    results.append(station)
+        if len(results) < limit:
+            import difflib
+
+            for city in difflib.get_close_matches(query, self._by_city, n=limit, cutoff=0.5):
+                for station in self._by_city[city]:
+                    if station.code not in seen:
+                        seen.add(station.code)
+                        results.append(station)
+        return results[:limit]
+
+
+@callback
+def async_get_directory(hass: HomeAssistant) -> StationDirectory:
+    if (directory := hass.data.get(DATA_DIRECTORY)) is None:
+        directory = hass.data[DATA_DIRECTORY] = StationDirectory(hass)
+    return directory
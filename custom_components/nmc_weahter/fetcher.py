@@ -0,0 +1,262 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import random
+import time
+from dataclasses import dataclass
+from aiohttp import ClientError, ClientResponseError, ClientSession, hdrs
+from yarl import URL
+
+_LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 8192
+
+RETRIES = 2
+RETRY_BASE_DELAY = 1
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+BREAKER_MAX_COOLDOWN = 600
+
+
+@dataclass
+class Validator:
+    etag: str | None = None
+    last_modified: str | None = None
+    digest: bytes | None = None
+
+
+class RateLimiter:
+    """Token bucket plus concurrency budget shared by many fetchers.
+
+    Waiters are served in arrival order, so bursts from many stations are
+    spread out at `rate` requests per second after the first `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _async_acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        await self._async_acquire()
+        async with self._semaphore:
+            yield
+
+
+class CircuitOpenError(Exception):
+    """Requests to a host are suspended after repeated failures."""
+
+
+class CircuitBreaker:
+    """Stop requesting a failing host for a growing cool down period.
+
+    After `threshold` consecutive failures the circuit opens. Once the cool
+    down has passed requests are let through again; another failure reopens
+    it with a doubled cool down, a success closes it.
+    """
+
+    def __init__(self, host, threshold=BREAKER_THRESHOLD):
+        self.host = host
+        self._threshold = threshold
+        self._failures = 0
+        self._cooldown = BREAKER_COOLDOWN
+        self._open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def check(self):
+        if self.is_open:
+            raise CircuitOpenError(f"requests to {self.host} suspended")
+
+    def record_success(self):
+        self._failures = 0
+        self._cooldown = BREAKER_COOLDOWN
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self._threshold:
+            self._open_until = time.monotonic() + self._cooldown
+            _LOGGER.warning("%s keeps failing, suspend requests for %ds",
+                            self.host, self._cooldown)
+            self._cooldown = min(self._cooldown * 2, BREAKER_MAX_COOLDOWN)
+
+
+class CircuitBreakers(dict):
+    """Circuit breakers by host, shared by all fetchers."""
+
+    def __missing__(self, host):
+        breaker = self[host] = CircuitBreaker(host)
+        return breaker
+
+
+class NMCFetcher:
+    """GET helper that remembers HTTP validators and body hashes per url.
+
+    async_get returns None when the resource is known to be unchanged, either
+    because the server answered 304 or because the body hashes the same as the
+    last time, so callers can keep their previously parsed result.
+    """
+
+    def __init__(self, session: ClientSession, max_concurrency: int,
+                 limiter: RateLimiter | None = None,
+                 breakers: CircuitBreakers | None = None):
+        self.session = session
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._limiter = limiter
+        self._breakers = breakers
+        self._validators: dict[str, Validator] = {}
+        # 最近一次响应的字节数，用于诊断
+        self.sizes: dict[str, int] = {}
+
+    def forget(self, url=None):
+        """Drop the validators of url, or of every url, so the next response counts as changed."""
+        if url is None:
+            self._validators.clear()
+        else:
+            self._validators.pop(url, None)
+
+    @staticmethod
+    def _headers(validator):
+        headers = {}
+        if validator is not None:
+            if validator.etag:
+                headers[hdrs.IF_NONE_MATCH] = validator.etag
+            if validator.last_modified:
+                headers[hdrs.IF_MODIFIED_SINCE] = validator.last_modified
+        return headers
+
+    def _update_validator(self, url, validator, response, digest) -> bool:
+        """Remember the validators of a response, returns False if the body is unchanged."""
+        self._validators[url] = Validator(
+            response.headers.get(hdrs.ETAG),
+            response.headers.get(hdrs.LAST_MODIFIED),
+            digest)
+        if digest is not None and validator is not None and validator.digest == digest:
+            _LOGGER.debug("%s not modified", url)
+            return False
+        return True
+
+    async def async_get(self, url, timeout, conditional=True) -> str | None:
+        async def read(response, validator):
+            body = await response.read()
+            self.sizes[url] = len(body)
+            text = await response.text()
+            digest = hashlib.sha1(body, usedforsecurity=False).digest()
+            if not self._update_validator(url, validator, response, digest):
+                return None
+            return text
+
+        return await self._async_request(url, timeout, conditional, read)
+
+    async def async_get_body(self, url, timeout, conditional=True) -> tuple[bytes, str] | None:
+        """Stream the body while hashing it, returns (body, encoding).
+
+        Nothing is parsed here, so callers can build a document in an executor
+        and only do so when the page has changed.
+        """
+        async def read(response, validator):
+            digest = hashlib.sha1(usedforsecurity=False)
+            chunks = []
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                digest.update(chunk)
+                chunks.append(chunk)
+            body = b"".join(chunks)
+            self.sizes[url] = len(body)
+            if not self._update_validator(url, validator, response, digest.digest()):
+                return None
+            return body, response.charset or "utf-8"
+
+        return await self._async_request(url, timeout, conditional, read)
+
+    async def async_get_parsed(self, url, timeout, parser_factory, conditional=True):
+        """Stream the body into an incremental parser instead of buffering it.
+
+        parser_factory(encoding) returns an object whose feed(chunk) returns
+        True once it has what it needs, which stops reading the rest of the
+        body, and whose close() returns the result. The parser runs on the
+        event loop, so it has to be cheap, like a pull parser looking for one
+        tag.
+        """
+        async def read(response, validator):
+            parser = parser_factory(response.charset or "utf-8")
+            digest = hashlib.sha1(usedforsecurity=False)
+            stopped = False
+            size = 0
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                self.sizes[url] = size
+                if parser.feed(chunk):
+                    stopped = True
+                    break
+                digest.update(chunk)
+            result = parser.close()
+            if stopped:
+                # 提前结束时无法比较整页的哈希，改为比较解析结果
+                digest = hashlib.sha1(repr(result).encode(), usedforsecurity=False)
+            if not self._update_validator(url, validator, response, digest.digest()):
+                return None
+            return result
+
+        return await self._async_request(url, timeout, conditional, read)
+
+    async def _async_request(self, url, timeout, conditional, read):
+        """GET with jittered retries, guarded by the circuit breaker of the host."""
+        validator = self._validators.get(url) if conditional else None
+        headers = self._headers(validator)
+        breaker = self._breakers[URL(url).host] if self._breakers is not None else None
+
+        attempt = 0
+        while True:
+            if breaker is not None:
+                breaker.check()
+            try:
+                limiter = self._limiter.slot() if self._limiter else contextlib.nullcontext()
+                async with self._semaphore, limiter:
+                    async with asyncio.timeout(timeout):
+                        async with self.session.get(url, headers=headers) as response:
+                            if response.status == 304 and validator is not None:
+                                result = None
+                            else:
+                                response.raise_for_status()
+                                result = await read(response, validator)
+            except Exception as err:
+                if not _retryable(err):
+                    raise
+                if breaker is not None:
+                    breaker.record_failure()
+                if attempt >= RETRIES:
+                    raise
+                # 全抖动退避，避免各站点同时重试
+                delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt)
+                attempt += 1
+                _LOGGER.debug("retry %s in %.1fs after %r", url, delay, err)
+                await asyncio.sleep(delay)
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+def _retryable(err) -> bool:
+    if isinstance(err, ClientResponseError):
+        return err.status >= 500
+    return isinstance(err, (ClientError, TimeoutError))
@@ -0,0 +1,46 @@
+from homeassistant.components.weather import (
+    ATTR_FORECAST_CONDITION,
+    ATTR_FORECAST_NATIVE_TEMP,
+    ATTR_FORECAST_NATIVE_TEMP_LOW,
+    ATTR_FORECAST_TIME,
+    ATTR_FORECAST_WIND_BEARING,
+    ATTR_FORECAST_NATIVE_WIND_SPEED,
+    ATTR_FORECAST_IS_DAYTIME,
+    Forecast
+)
+
+from .condition import condition_map
+from .model import StationForecast
+
+
+def build_twice_daily(forecast: StationForecast) -> list[Forecast]:
+    forecast_data = []
+    for detail in forecast.daily:
+        for predict, is_daytime in ((detail.day, True), (detail.night, False)):
+            data_dict = {
+                ATTR_FORECAST_TIME: detail.date,
+                ATTR_FORECAST_CONDITION: condition_map(predict.condition),
+                ATTR_FORECAST_NATIVE_TEMP: predict.temperature,
+                ATTR_FORECAST_WIND_BEARING: predict.wind_direct,
+                ATTR_FORECAST_NATIVE_WIND_SPEED: predict.wind_power,
+                ATTR_FORECAST_IS_DAYTIME: is_daytime
+            }
+            forecast_data.append(data_dict)
+    return forecast_data
+
+
+def build_daily(forecast: StationForecast) -> list[Forecast]:
+    forecast_data = []
+    for detail in forecast.daily:
+        temp_day = detail.day.temperature
+        temp_night = detail.night.temperature
+        data_dict = {
+            ATTR_FORECAST_TIME: detail.date,
+            ATTR_FORECAST_CONDITION: condition_map(detail.day.condition),
+            ATTR_FORECAST_NATIVE_TEMP: max(temp_day, temp_night),
+            ATTR_FORECAST_NATIVE_TEMP_LOW: min(temp_day, temp_night),
+            ATTR_FORECAST_WIND_BEARING: detail.day.wind_direct,
+            ATTR_FORECAST_NATIVE_WIND_SPEED: detail.day.wind_power,
+        }
+        forecast_data.append(data_dict)
+    return forecast_data
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import bisect
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# 保留一周的逐小时实况
+MAX_AGE = timedelta(days=7)
+# 时间都是不带时区的北京时间，按固定纪元换算，不受系统时区影响
+EPOCH = datetime(1970, 1, 1)
+COLUMNS = ("temperature", "pressure", "humidity", "rain", "wind_speed", "wind_direction")
+
+
+@dataclass(slots=True, frozen=True)
+class ColumnStats:
+    count: int
+    min: float | None
+    max: float | None
+    mean: float | None
+    sum: float | None
+
+
+class ObservationHistory:
+    """Rolling hourly observations of one station in array backed columns.
+
+    Every refresh carries the past 24 hours of observations, so consecutive
+    refreshes overlap by almost a day. merge() only rewrites the overlapping
+    tail, newer values win, and rows older than MAX_AGE are dropped. Missing
+    values are stored as NaN and skipped by queries.
+    """
+
+    def __init__(self, max_age: timedelta = MAX_AGE):
+        self._max_age = max_age.total_seconds()
+        # 自EPOCH起的秒数，升序
+        self.times = array("q")
+        self.columns = {name: array("d") for name in COLUMNS}
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def last_time(self) -> datetime | None:
+        return EPOCH + timedelta(seconds=self.times[-1]) if self.times else None
+
+    def merge(self, observations) -> bool:
+        """Merge a batch of observations, returns True if anything changed."""
+        rows = {_seconds(o.time): o for o in observations if o.time is not None}
+        if not rows:
+            return False
+        first = min(rows)
+        start = bisect.bisect_left(self.times, first)
+
+        # 只重建与新数据重叠的尾部
+        merged = {t: tuple(self.columns[name][i] for name in COLUMNS)
+                  for i, t in enumerate(self.times[start:], start)}
+        before = dict(merged)
+        for t, o in rows.items():
+            merged[t] = tuple(_value(getattr(o, name)) for name in COLUMNS)
+        if _same(merged, before):
+            return False
+
+        del self.times[start:]
+        for column in self.columns.values():
+            del column[start:]
+        for t in sorted(merged):
+            self.times.append(t)
+            for name, value in zip(COLUMNS, merged[t]):
+                self.columns[name].append(value)
+
+        if (drop := bisect.bisect_left(self.times, self.times[-1] - self._max_age)) > 0:
+            del self.times[:drop]
+            for column in self.columns.values():
+                del column[:drop]
+        return True
+
+    def stats(self, column, window: timedelta, end: datetime | None = None) -> ColumnStats:
+        """min/max/mean/sum of a column over the window ending at end (default the last row)."""
+        if not self.times:
+            return ColumnStats(0, None, None, None, None)
+        stop_time = _seconds(end) if end is not None else self.times[-1]
+        start = bisect.bisect_right(self.times, stop_time - window.total_seconds())
+        stop = bisect.bisect_right(self.times, stop_time)
+        values = array("d", filter(math.isfinite, self.columns[column][start:stop]))
+        if not values:
+            return ColumnStats(0, None, None, None, None)
+        total = math.fsum(values)
+        return ColumnStats(len(values), min(values), max(values), total / len(values), total)
+
+    def as_dict(self):
+        return {
+            "times": self.times.tolist(),
+            **{name: [None if math.isnan(v) else v for v in column]
+               for name, column in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> ObservationHistory:
+        history = cls()
+        history.times = array("q", data["times"])
+        for name in COLUMNS:
+            history.columns[name] = array(
+                "d", (math.nan if v is None else v for v in data[name]))
+        return history
+
+
+def _seconds(time: datetime) -> int:
+    return int((time - EPOCH).total_seconds())
+
+
+def _value(value):
+    return math.nan if value is None else float(value)
+
+
+def _same(a, b):
+    # NaN与自身不相等，逐项比较时按缺测处理
+    if a.keys() != b.keys():
+        return False
+    return all(x == y or (math.isnan(x) and math.isnan(y))
+               for t in a for x, y in zip(a[t], b[t]))
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from datetime import datetime
+from urllib.parse import urljoin
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import DEFAULT_MAX_CONCURRENCY, DOMAIN
+from .alert import AlertIndex
+from .fetcher import CircuitBreakers, NMCFetcher, RateLimiter
+from .model import ImageData
+from .parser import ImagePageParser
+from .image_cache import NMCImageCache
+from .scheduler import ProductSchedule, RefreshScheduler, china_now
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_HUB = "nmc_weather_hub"
+
+# 所有站点的预报请求共用的速率与并发预算
+STATION_RATE = 2
+STATION_BURST = 4
+STATION_CONCURRENCY = 4
+# 黄金分割序列，新加入的站点总是落在已有站点之间最大的空隙里
+GOLDEN_RATIO = 0.6180339887
+
+
+class NMCFetchHub:
+    """Process wide fetcher for national products shared by all stations."""
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        session = async_get_clientsession(hass)
+        self.breakers = CircuitBreakers()
+        self._fetcher = NMCFetcher(
+            session, DEFAULT_MAX_CONCURRENCY, breakers=self.breakers)
+        # 磁盘缓存默认关闭，任一已加载的站点开启时启用
+        self.image_cache = NMCImageCache(hass, session)
+        self._cache = {}
+        self._inflight = {}
+        self._schedules: dict[str, ProductSchedule] = {}
+        self.station_limiter = RateLimiter(
+            STATION_RATE, STATION_BURST, STATION_CONCURRENCY)
+        self._stations: dict[str, float] = {}
+        # 所有站点共用一个定时器
+        self.scheduler = RefreshScheduler(hass)
+        # 预警按编号在所有站点间去重
+        self.alerts = AlertIndex(hass)
+
+    def station_phase(self, station_code) -> float:
+        """Spread stations evenly over [0, 1) so their refreshes do not line up."""
+        if (phase := self._stations.get(station_code)) is None:
+            phase = self._stations[station_code] = (
+                len(self._stations) * GOLDEN_RATIO) % 1
+        return phase
+
+    async def async_update_image_cache(self, coordinators):
+        """Spill images to disk while any of the loaded stations asks for it."""
+        enabled = any(coordinator.image_disk_cache for coordinator in coordinators)
+        await self.image_cache.async_set_disk(
+            self.hass.config.path(DOMAIN, "images") if enabled else None)
+
+    def expire(self, html_url):
+        """Make a page due and forget what it looked like, so the next request fetches and parses it."""
+        if (schedule := self._schedules.get(html_url)) is not None:
+            schedule.next_poll = None
+        self._fetcher.forget(html_url)
+
+    def response_size(self, html_url):
+        return self._fetcher.sizes.get(html_url)
+
+    def next_poll(self, html_url):
+        if (schedule := self._schedules.get(html_url)) is None:
+            return None
+        return schedule.next_poll
+
+    async def async_get_image(self, html_url, interval, timeout):
+        # 全国产品与站点无关，只在预计有新发布时抓取
+        if (schedule := self._schedules.get(html_url)) is None:
+            schedule = self._schedules[html_url] = ProductSchedule(interval)
+        if (cached := self._cache.get(html_url)) is not None and not schedule.due(china_now()):
+            return cached
+
+        # 同一页面的并发请求合并为一次
+        if (task := self._inflight.get(html_url)) is None:
+            task = self.hass.async_create_task(
+                self._async_fetch_image(html_url, schedule, timeout))
+            self._inflight[html_url] = task
+            task.add_done_callback(
+                lambda _: self._inflight.pop(html_url, None))
+        return await asyncio.shield(task)
+
+    async def _async_fetch_image(self, html_url, schedule, timeout):
+        cached = self._cache.get(html_url)
+        now = china_now()
+        try:
+            attrib = await self._fetcher.async_get_parsed(
+                html_url, timeout, ImagePageParser, conditional=cached is not None)
+        except Exception:
+            schedule.record_failure(now)
+            raise
+        if attrib is None:
+            # 页面未更新，沿用上次解析结果
+            schedule.record(cached.update_time, now)
+            return cached
+
+        result = ImageData(
+            url=urljoin(html_url, attrib["src"]),
+            update_time=datetime.strptime(f"{datetime.now().year}/{attrib['data-time']}", "%Y/%m/%d %H:%M")
+        )
+        self._cache[html_url] = result
+        schedule.record(result.update_time, now)
+        return result
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> NMCFetchHub:
+    if (hub := hass.data.get(DATA_HUB)) is None:
+        hub = hass.data[DATA_HUB] = NMCFetchHub(hass)
+    return hub
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 
+import asyncio
 import logging
 from homeassistant.components.image import ImageEntity, ImageEntityDescription
 from homeassistant.config_entries import ConfigEntry
@@ -10,6 +11,7 @@ from homeassistant.helpers.entity_platform import (
 )
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .radar import RadarLoop
 from .const import (
     DOMAIN,
     CONF_IMAGES,
@@ -17,6 +19,11 @@ from .const import (
     CONF_IMAGE_PRECIPITATION24,
     CONF_IMAGE_MAX_TEMPERATURE24,
     CONF_IMAGE_TEMPERATURE_HOURLY,
+    CONF_IMAGE_RADAR_LOOP,
+    CONF_RADAR_FRAMES,
+    CONF_RADAR_MAX_SIZE,
+    DEFAULT_RADAR_FRAMES,
+    DEFAULT_RADAR_MAX_SIZE,
     DATA_PRECIPITATION24,
     DATA_MAX_TEMPERATURE24,
     DATA_RADAR,
@@ -60,8 +67,15 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
-    async_add_entities([NMCImageEntity(hass, coordinator, description)
-                        for description in CAMERA_TYPE if description.key in (config_entry.data.get(CONF_IMAGES, []))])
+    images = config_entry.data.get(CONF_IMAGES, [])
+    entities = [NMCImageEntity(hass, coordinator, description)
+                for description in CAMERA_TYPE if description.key in images]
+    if CONF_IMAGE_RADAR_LOOP in images:
+        entities.append(NMCRadarLoopEntity(hass, coordinator, RadarLoop(
+            config_entry.data.get(CONF_RADAR_FRAMES, DEFAULT_RADAR_FRAMES),
+            config_entry.data.get(CONF_RADAR_MAX_SIZE, DEFAULT_RADAR_MAX_SIZE) * 1024 * 1024
+        )))
+    async_add_entities(entities)
 
 
 class NMCImageEntity(CoordinatorEntity, ImageEntity):
@@ -74,17 +88,82 @@ class NMCImageEntity(CoordinatorEntity, ImageEntity):
         self._data_key = description.data_key
         self._attr_unique_id = f"nmc-{coordinator.config_entry.unique_id}-image-{description.key}"
         self._attr_device_info = coordinator.device_info
-        self._attr_image_url = self.coordinator.data[self._data_key]["url"]
-        self._attr_image_last_updated = self.coordinator.data[self._data_key]["update_time"]
+        # ImageEntity默认为UNDEFINED，没有图片数据时明确为None
+        self._attr_image_url = None
+        if (data := self.coordinator.data.get(self._data_key)) is not None:
+            self._attr_image_url = data.url
+            self._attr_image_last_updated = data.update_time
+
+    async def async_image(self) -> bytes | None:
+        """Serve the image from the shared cache instead of downloading it per entity."""
+        if self._attr_image_url is None:
+            return None
+        try:
+            content, self._attr_content_type = await self.coordinator.hub.image_cache.async_get(
+                self._attr_image_url)
+        except Exception as err:
+            _LOGGER.warning("fetch image %s failed: %r", self._attr_image_url, err)
+            return None
+        return content
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         if (data := self.coordinator.data.get(self._data_key)) is None:
             return
-        if (data.get("url") != self._attr_image_url or data.get("update_time") != self._attr_image_last_updated):
-            self._attr_image_url = data.get("url")
-            self._cached_image = None
-            self._attr_image_last_updated = data.get("update_time")
+        if (data.url != self._attr_image_url or data.update_time != self._attr_image_last_updated):
+            self._attr_image_url = data.url
+            self._attr_image_last_updated = data.update_time
 
             super()._handle_coordinator_update()
+
+
+class NMCRadarLoopEntity(CoordinatorEntity, ImageEntity):
+
+    _attr_name = "Radar Loop"
+    _attr_content_type = "image/gif"
+
+    def __init__(self, hass, coordinator, radar_loop: RadarLoop):
+        super().__init__(coordinator)
+        ImageEntity.__init__(self, hass)
+
+        self._radar_loop = radar_loop
+        self._lock = asyncio.Lock()
+        self._attr_unique_id = f"nmc-{coordinator.config_entry.unique_id}-image-{CONF_IMAGE_RADAR_LOOP}"
+        self._attr_device_info = coordinator.device_info
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._async_schedule_frame()
+
+    async def async_image(self) -> bytes | None:
+        return self._radar_loop.animation
+
+    @callback
+    def _async_schedule_frame(self):
+        if (data := self.coordinator.data.get(DATA_RADAR)) is None:
+            return
+        if self._radar_loop.last_update is not None and data.update_time <= self._radar_loop.last_update:
+            return
+        self.coordinator.config_entry.async_create_background_task(
+            self.hass, self._async_add_frame(data), f"{self.entity_id} add frame")
+
+    async def _async_add_frame(self, data):
+        # 每次只下载新发布的一帧
+        async with self._lock:
+            if self._radar_loop.last_update is not None and data.update_time <= self._radar_loop.last_update:
+                return
+            try:
+                content, _ = await self.coordinator.hub.image_cache.async_get(data.url)
+                await self.hass.async_add_executor_job(
+                    self._radar_loop.add_frame, data.update_time, content)
+            except Exception as err:
+                _LOGGER.warning("add radar frame %s failed: %r", data.url, err)
+                return
+        self._attr_image_last_updated = data.update_time
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._async_schedule_frame()
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from aiohttp import ClientSession, hdrs
+from homeassistant.core import HomeAssistant
+from .const import DEFAULT_REQUEST_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_MEMORY_BYTES = 16 * 1024 * 1024
+MAX_DISK_BYTES = 64 * 1024 * 1024
+
+
+class NMCImageCache:
+    """Content addressed, size bounded LRU cache of image bytes.
+
+    Every url is downloaded once and mapped to the digest of its content, so
+    entities sharing a url (or urls serving identical bytes) share one copy.
+    Entries evicted from memory spill to a disk tier while one is set with
+    async_set_disk().
+    """
+
+    def __init__(self, hass: HomeAssistant, session: ClientSession,
+                 max_memory=MAX_MEMORY_BYTES, disk_path=None, max_disk=MAX_DISK_BYTES):
+        self.hass = hass
+        self.session = session
+        self._max_memory = max_memory
+        self._disk_path = disk_path
+        self._max_disk = max_disk
+        self._urls: dict[str, str] = {}
+        self._content_types: dict[str, str] = {}
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        # 已经清理并创建好的目录
+        self._disk_ready = None
+        # 正在写入磁盘的条目，写完之前从这里读取
+        self._writing: dict[str, bytes] = {}
+        self._disk_reads: dict[str, asyncio.Task] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def async_set_disk(self, path, max_disk=None):
+        """Spill entries evicted from memory to files under path, None drops the disk tier."""
+        if max_disk is not None:
+            self._max_disk = max_disk
+        if path == self._disk_path:
+            return
+        old_path, dropped = self._disk_path, list(self._disk)
+        self._disk_path = path
+        self._disk_ready = None
+        self._disk.clear()
+        self._disk_size = 0
+        self._forget(dropped)
+        if old_path is not None:
+            await self.hass.async_add_executor_job(shutil.rmtree, old_path, True)
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_path": self._disk_path,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+        }
+
+    async def async_get(self, url) -> tuple[bytes, str] | None:
+        """Return (content, content_type) of an image url."""
+        if (digest := self._urls.get(url)) is not None:
+            if (content := await self._async_lookup(digest)) is not None:
+                self.hits += 1
+                return content, self._content_types[digest]
+            self._urls.pop(url, None)
+
+        self.misses += 1
+
+        if (task := self._inflight.get(url)) is None:
+            task = self.hass.async_create_task(self._async_fetch(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _async_lookup(self, digest):
+        if (content := self._memory.get(digest)) is not None:
+            self._memory.move_to_end(digest)
+            return content
+        if (content := self._writing.get(digest)) is not None:
+            return content
+        if digest not in self._disk:
+            return None
+
+        # 同一条目的并发读取合并为一次
+        if (task := self._disk_reads.get(digest)) is None:
+            task = self.hass.async_create_task(self._async_read_disk(self._disk_path, digest))
+            self._disk_reads[digest] = task
+            task.add_done_callback(lambda _: self._disk_reads.pop(digest, None))
+        return await asyncio.shield(task)
+
+    async def _async_read_disk(self, path, digest):
+        try:
+            content = await self.hass.async_add_executor_job(
+                self._read_disk, path, digest)
+        except OSError:
+            _LOGGER.warning("read cached image %s failed", digest)
+            content = None
+        # 读取期间可能已被淘汰
+        self._disk_size -= self._disk.pop(digest, 0)
+        if content is not None:
+            await self._async_put(digest, content)
+        return content
+
+    async def _async_fetch(self, url):
+        async with asyncio.timeout(DEFAULT_REQUEST_TIMEOUT):
+            async with self.session.get(url) as response:
+                response.raise_for_status()
+                content = await response.read()
+                content_type = response.headers.get(
+                    hdrs.CONTENT_TYPE, "image/png").split(";")[0]
+
+        digest = hashlib.sha1(content, usedforsecurity=False).hexdigest()
+        self._urls[url] = digest
+        self._content_types[digest] = content_type
+        if await self._async_lookup(digest) is None:
+            await self._async_put(digest, content)
+        return content, content_type
+
+    async def _async_put(self, digest, content):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        self._memory[digest] = content
+        self._memory_size += len(content)
+        spilled = []
+        while self._memory_size > self._max_memory and len(self._memory) > 1:
+            old_digest, old_content = self._memory.popitem(last=False)
+            self._memory_size -= len(old_content)
+            spilled.append((old_digest, old_content))
+        if not spilled:
+            return
+
+        if (path := self._disk_path) is None:
+            self._forget(digest for digest, _ in spilled)
+            return
+
+        # 文件写入完成后才登记，避免并发读取到尚未写入的文件
+        self._writing.update(spilled)
+        try:
+            await self.hass.async_add_executor_job(self._write_disk, path, spilled)
+        except OSError:
+            _LOGGER.warning("write cached images failed")
+            self._forget(digest for digest, _ in spilled
+                         if digest not in self._memory)
+            return
+        finally:
+            for old_digest, _ in spilled:
+                self._writing.pop(old_digest, None)
+        if path != self._disk_path:
+            # 写入期间磁盘缓存被关闭或换了目录，写入可能重建了已删除的旧目录
+            self._forget(digest for digest, _ in spilled
+                         if digest not in self._memory)
+            if self._disk_ready == path:
+                self._disk_ready = None
+            await self.hass.async_add_executor_job(shutil.rmtree, path, True)
+            return
+
+        for old_digest, old_content in spilled:
+            # 写入期间重新进入内存的条目不再登记
+            if old_digest in self._memory or old_digest in self._disk:
+                continue
+            self._disk[old_digest] = len(old_content)
+            self._disk_size += len(old_content)
+        evicted = []
+        while self._disk_size > self._max_disk and self._disk:
+            old_digest, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(old_digest)
+        if evicted:
+            self._forget(evicted)
+            await self.hass.async_add_executor_job(self._remove_disk, path, evicted)
+
+    def _forget(self, digests):
+        digests = set(digests)
+        for digest in digests:
+            self._content_types.pop(digest, None)
+        self._urls = {url: digest for url, digest in self._urls.items()
+                      if digest not in digests}
+
+    def _ensure_disk(self, path):
+        # 磁盘缓存只在本次运行中有效，启动时清理旧文件
+        if self._disk_ready != path:
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path, exist_ok=True)
+            self._disk_ready = path
+
+    @staticmethod
+    def _read_disk(path, digest):
+        with open(os.path.join(path, digest), "rb") as file:
+            return file.read()
+
+    def _write_disk(self, path, spilled):
+        self._ensure_disk(path)
+        for digest, content in spilled:
+            with open(os.path.join(path, digest), "wb") as file:
+                file.write(content)
+
+    @staticmethod
+    def _remove_disk(path, evicted):
+        for digest in evicted:
+            try:
+                os.remove(os.path.join(path, digest))
+            except FileNotFoundError:
+                pass
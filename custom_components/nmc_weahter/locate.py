@@ -0,0 +1,172 @@
+"""Nearest station lookup over a station coordinate table.
+
+nmc.cn does not publish station coordinates, so the table is provided by the
+user as a CSV file with `code,latitude,longitude[,name]` rows. This module has
+no Home Assistant imports and can be run on its own to map many coordinates
+to station codes offline:
+
+    python locate.py stations.csv coordinates.csv
+
+where every row of coordinates.csv is `latitude,longitude`.
+"""
+from __future__ import annotations
+import csv
+import math
+import sys
+from dataclasses import dataclass
+
+EARTH_RADIUS = 6371.0
+# 网格边长（度），全国约2400个站点，每格平均只有几个站点
+CELL_SIZE = 1.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+@dataclass(slots=True, frozen=True)
+class StationLocation:
+    code: str
+    latitude: float
+    longitude: float
+    name: str | None = None
+
+
+def distance(lat1, lon1, lat2, lon2) -> float:
+    """Great circle distance in km."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StationLocator:
+    """Grid index of station coordinates.
+
+    Stations are bucketed into CELL_SIZE degree cells. A query scans rings of
+    cells around the query point and stops once no unscanned cell can hold a
+    closer station, so it only looks at a handful of stations.
+    """
+
+    def __init__(self, stations):
+        self._grid: dict[tuple[int, int], list[StationLocation]] = {}
+        self._count = 0
+        for station in stations:
+            self._grid.setdefault(self._cell(station.latitude, station.longitude), []).append(station)
+            self._count += 1
+        rows = [r for r, _ in self._grid] or [0]
+        cols = [c for _, c in self._grid] or [0]
+        self._rows = min(rows), max(rows)
+        self._cols = min(cols), max(cols)
+        self._max_latitude = max(max(abs(r), abs(r + 1)) * CELL_SIZE for r in rows)
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def _cell(latitude, longitude):
+        return math.floor(latitude / CELL_SIZE), math.floor(longitude / CELL_SIZE)
+
+    def _ring_distances(self, latitude, longitude):
+        """Lower bounds in km on the distance to any cell `ring` rings out.
+
+        Along a meridian a ring is CELL_SIZE degrees of arc. Along a parallel
+        it shrinks with latitude, and both the query and the station can be
+        as far from the equator as the larger of the two, so the bound uses
+        the query latitude as well as the stations' for queries outside the
+        stations' area. Going the other way round the globe also caps the
+        longitude difference.
+        """
+        max_latitude = math.radians(min(90.0, max(abs(latitude), self._max_latitude)))
+        cos_latitude = math.cos(max_latitude)
+        farthest = max(longitude - self._cols[0] * CELL_SIZE,
+                       (self._cols[1] + 1) * CELL_SIZE - longitude)
+        ring = 0
+        while True:
+            degrees = ring * CELL_SIZE
+            latitude_arc = math.radians(min(180.0, degrees))
+            longitude_arc = math.radians(max(0.0, min(180.0, degrees, 360.0 - farthest)))
+            # 半正矢公式中经差一项的下界
+            yield EARTH_RADIUS * min(
+                latitude_arc, 2 * math.asin(cos_latitude * math.sin(longitude_arc / 2)))
+            ring += 1
+
+    def _ring(self, row, col, ring):
+        """Cells of the ring, clipped to the cells that hold stations."""
+        if ring == 0:
+            yield row, col
+            return
+        top, bottom = self._rows
+        left, right = self._cols
+        columns = range(max(col - ring, left), min(col + ring, right) + 1)
+        for r in (row - ring, row + ring):
+            if top <= r <= bottom:
+                for c in columns:
+                    yield r, c
+        rows = range(max(row - ring + 1, top), min(row + ring - 1, bottom) + 1)
+        for c in (col - ring, col + ring):
+            if left <= c <= right:
+                for r in rows:
+                    yield r, c
+
+    def nearest(self, latitude, longitude, count=1) -> list[tuple[StationLocation, float]]:
+        """The `count` closest stations with their distance in km, closest first."""
+        if not self._count:
+            return []
+        count = min(count, self._count)
+        row, col = self._cell(latitude, longitude)
+        found: list[tuple[float, StationLocation]] = []
+        # 超过这个圈数所有格子都已扫描
+        last_ring = max(row - self._rows[0], self._rows[1] - row,
+                        col - self._cols[0], self._cols[1] - col)
+        for ring, ring_distance in zip(range(last_ring + 1), self._ring_distances(latitude, longitude)):
+            for cell in self._ring(row, col, ring):
+                for station in self._grid.get(cell, ()):
+                    found.append((distance(latitude, longitude,
+                                           station.latitude, station.longitude), station))
+            if len(found) >= count:
+                found.sort(key=lambda item: item[0])
+                # 未扫描的格子至少相隔ring个格子
+                if found[count - 1][0] <= ring_distance:
+                    break
+        found.sort(key=lambda item: item[0])
+        return [(station, dist) for dist, station in found[:count]]
+
+    def bulk_nearest(self, coordinates) -> list[str | None]:
+        """Station codes closest to each (latitude, longitude) pair."""
+        codes = []
+        for latitude, longitude in coordinates:
+            nearest = self.nearest(latitude, longitude)
+            codes.append(nearest[0][0].code if nearest else None)
+        return codes
+
+
+def load_stations(path) -> list[StationLocation]:
+    stations = []
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                latitude, longitude = float(row[1]), float(row[2])
+            except (IndexError, ValueError):
+                # 表头或格式错误的行
+                continue
+            name = row[3].strip() if len(row) > 3 and row[3].strip() else None
+            stations.append(StationLocation(row[0].strip(), latitude, longitude, name))
+    return stations
+
+
+def main(argv):
+    if len(argv) != 3:
+        print(__doc__, file=sys.stderr)
+        return 2
+    locator = StationLocator(load_stations(argv[1]))
+    with open(argv[2], newline="", encoding="utf-8") as file:
+        coordinates = [(float(row[0]), float(row[1]))
+                       for row in csv.reader(file) if row and not row[0].startswith("#")]
+    writer = csv.writer(sys.stdout)
+    for (latitude, longitude), code in zip(coordinates, locator.bulk_nearest(coordinates)):
+        writer.writerow((latitude, longitude, code or ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
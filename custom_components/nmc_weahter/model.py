@@ -0,0 +1,166 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+
+from .alert import Alert
+
+# nmc.cn 用 9999 表示缺测
+MISSING = 9999
+
+
+def _publish_time(value) -> datetime | None:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return None
+
+
+def _datetime(value) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _observed(value):
+    return None if value is None or value == MISSING else value
+
+
+@dataclass(slots=True, frozen=True)
+class Observation:
+    """One hourly observation of passedchart."""
+
+    time: datetime | None
+    temperature: float | None
+    pressure: float | None
+    humidity: float | None
+    rain: float | None
+    wind_speed: float | None
+    wind_direction: float | None
+
+    @classmethod
+    def from_json(cls, data) -> Observation:
+        return cls(
+            time=_publish_time(data.get('time')),
+            temperature=_observed(data.get('temperature')),
+            pressure=_observed(data.get('pressure')),
+            humidity=_observed(data.get('humidity')),
+            rain=_observed(data.get('rain1h')),
+            wind_speed=_observed(data.get('windSpeed')),
+            wind_direction=_observed(data.get('windDirection')),
+        )
+
+    @classmethod
+    def from_dict(cls, data) -> Observation:
+        return cls(**{**data, 'time': _datetime(data['time'])})
+
+
+@dataclass(slots=True, frozen=True)
+class HalfDayForecast:
+    condition: str
+    temperature: float
+    wind_direct: str
+    wind_power: str
+
+    @classmethod
+    def from_json(cls, data) -> HalfDayForecast:
+        return cls(
+            condition=data['weather']['info'],
+            temperature=data['weather']['temperature'],
+            wind_direct=data['wind']['direct'],
+            wind_power=data['wind']['power'],
+        )
+
+    @classmethod
+    def from_dict(cls, data) -> HalfDayForecast:
+        return cls(**data)
+
+
+@dataclass(slots=True, frozen=True)
+class DailyForecast:
+    date: datetime
+    day: HalfDayForecast
+    night: HalfDayForecast
+
+    @classmethod
+    def from_json(cls, data) -> DailyForecast:
+        return cls(
+            date=datetime.strptime(data['date'], '%Y-%m-%d'),
+            day=HalfDayForecast.from_json(data['day']),
+            night=HalfDayForecast.from_json(data['night']),
+        )
+
+    @classmethod
+    def from_dict(cls, data) -> DailyForecast:
+        return cls(
+            date=_datetime(data['date']),
+            day=HalfDayForecast.from_dict(data['day']),
+            night=HalfDayForecast.from_dict(data['night']),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class StationForecast:
+    """The parts of /rest/weather the entities use."""
+
+    publish_time: datetime | None
+    predict_publish_time: datetime | None
+    station_url: str
+    condition: str
+    temperature: float
+    humidity: float
+    pressure: float | None
+    wind_speed: float
+    wind_bearing: str
+    aqi: int
+    alert: str
+    # 不含当天
+    daily: tuple[DailyForecast, ...]
+    # 过去24小时逐小时实况，最新的在前
+    passed: tuple[Observation, ...] = ()
+    warning: Alert | None = None
+
+    @classmethod
+    def from_json(cls, data) -> StationForecast:
+        real = data['real']
+        pressure = real['weather']['airpressure']
+        if pressure == MISSING:
+            pressure = data['passedchart'][0]['pressure'] if data.get('passedchart') else None
+        return cls(
+            publish_time=_publish_time(real.get('publish_time')),
+            predict_publish_time=_publish_time(data['predict'].get('publish_time')),
+            station_url=data['predict']['station']['url'],
+            condition=real['weather']['info'],
+            temperature=real['weather']['temperature'],
+            humidity=float(real['weather']['humidity']),
+            pressure=pressure,
+            wind_speed=real['wind']['speed'],
+            wind_bearing=real['wind']['direct'],
+            aqi=data['air']['aqi'],
+            alert=real['warn']['alert'],
+            daily=tuple(DailyForecast.from_json(detail)
+                        for detail in data['predict']['detail'][1:]),
+            passed=tuple(Observation.from_json(item)
+                         for item in data.get('passedchart') or ()),
+            warning=Alert.from_json(real.get('warn')),
+        )
+
+    @classmethod
+    def from_dict(cls, data) -> StationForecast:
+        return cls(**{
+            **data,
+            'publish_time': _datetime(data['publish_time']),
+            'predict_publish_time': _datetime(data['predict_publish_time']),
+            'daily': tuple(DailyForecast.from_dict(detail) for detail in data['daily']),
+            'passed': tuple(Observation.from_dict(item) for item in data.get('passed', ())),
+            'warning': Alert.from_dict(data['warning']) if data.get('warning') else None,
+        })
+
+
+@dataclass(slots=True, frozen=True)
+class ImageData:
+    url: str
+    update_time: datetime
+
+    @classmethod
+    def from_dict(cls, data) -> ImageData:
+        return cls(url=data['url'], update_time=_datetime(data['update_time']))
@@ -1,23 +1,49 @@
+import asyncio
 import logging
-from datetime import timedelta, datetime
+import time
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, timedelta
 from urllib.parse import urljoin
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from lxml import html
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.components.weather import ATTR_FORECAST_TIME
+from homeassistant.util.json import json_loads
+from .fetcher import NMCFetcher
+from .history import ObservationHistory
+from .model import ImageData, StationForecast
+from .forecast import build_daily, build_twice_daily
+from .nowcast import build_nowcast
+from .hub import async_get_hub
+from .parser import parse_hourly_page
+from .scheduler import ProductSchedule, china_now
+from .stats import RefreshStats
 from .const import (
+    BASE_URL,
     DOMAIN,
     MANUFACTURER,
     CONF_STATION_CODE,
     CONF_IMAGES,
+    CONF_IMAGE_DISK_CACHE,
     CONF_IMAGE_MAX_TEMPERATURE24,
     CONF_IMAGE_TEMPERATURE_HOURLY,
     CONF_IMAGE_PRECIPITATION24,
     CONF_IMAGE_RADAR,
+    CONF_IMAGE_RADAR_LOOP,
+    CONF_MAX_CONCURRENCY,
+    CONF_REQUEST_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REQUEST_TIMEOUT,
     DATA_MAX_TEMPERATURE24,
     DATA_PRECIPITATION24,
     DATA_FORECAST,
     DATA_FORECAST_HOURLY,
+    DATA_FORECAST_DAILY,
+    DATA_FORECAST_TWICE_DAILY,
+    DATA_NOWCAST,
     DATA_RADAR,
     DATA_TEMPERATURE_HOURLY
 )
@@ -25,19 +51,88 @@ from .const import (
 _LOGGER = logging.getLogger(__name__)
 
 UPDATE_INTERVAL = timedelta(minutes=10)
+MIN_UPDATE_INTERVAL = timedelta(minutes=1)
+# 各站点的刷新在此窗口内错开
+STAGGER_WINDOW = timedelta(minutes=2)
+# 超过此时间的旧数据不再使用，实体变为不可用
+MAX_STALE = timedelta(hours=6)
+
+# 短时间内的多次更新合并为一次通知
+PUBLISH_DELAY = 0.5
+
+STORAGE_VERSION = 2
+STORAGE_SAVE_DELAY = 30
+# 由预报信息计算得到，不需要存储
+VIEW_KEYS = (DATA_FORECAST_DAILY, DATA_FORECAST_TWICE_DAILY)
+# 随时间变化，每次刷新重新计算
+DERIVED_KEYS = (*VIEW_KEYS, DATA_NOWCAST)
+STORE_HISTORY = "history"
+
+# (配置项, 数据项, 页面, 初始发布间隔)，发布间隔会根据实际发布时间学习调整
+IMAGE_PAGES = [
+    (CONF_IMAGE_MAX_TEMPERATURE24, DATA_MAX_TEMPERATURE24,
+     f"{BASE_URL}/publish/temperature/hight/24hour.html", timedelta(hours=6)),
+    (CONF_IMAGE_PRECIPITATION24, DATA_PRECIPITATION24,
+     f"{BASE_URL}/publish/precipitation/1-day.html", timedelta(hours=6)),
+    (CONF_IMAGE_RADAR, DATA_RADAR,
+     f"{BASE_URL}/publish/radar/chinaall.html", timedelta(minutes=6)),
+    (CONF_IMAGE_TEMPERATURE_HOURLY, DATA_TEMPERATURE_HOURLY,
+     f"{BASE_URL}/publish/observations/hourly-temperature.html", timedelta(hours=1))
+]
+
+
+def storage_key(station_code):
+    return f"{DOMAIN}.{station_code}"
+
+
+def build_views(forecast):
+    return {
+        DATA_FORECAST_DAILY: build_daily(forecast),
+        DATA_FORECAST_TWICE_DAILY: build_twice_daily(forecast),
+    }
 
 
 class NMCDataUpdateCoordinator(DataUpdateCoordinator):
     def __init__(self, hass, name, config):
         self.station_code = config.get(CONF_STATION_CODE)
-        self._images = config.get(CONF_IMAGES, [])
+        self._images = set(config.get(CONF_IMAGES, []))
+        # 雷达动画基于雷达图
+        if CONF_IMAGE_RADAR_LOOP in self._images:
+            self._images.add(CONF_IMAGE_RADAR)
+        self._request_timeout = config.get(
+            CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=UPDATE_INTERVAL,
+            # 不使用自己的定时器，由所有站点共用的调度器驱动刷新
+            update_interval=None,
+            # 数据未变化时不写入实体状态
+            always_update=False,
         )
+        # 下一次刷新的间隔，随各产品的预计发布时间变化
+        self.refresh_interval = UPDATE_INTERVAL
+        self._unsub_scheduled = None
         self.session = async_get_clientsession(self.hass)
+        self.hub = async_get_hub(self.hass)
+        # 图片缓存由所有站点共用，是否使用磁盘由所有已加载的站点共同决定
+        self.image_disk_cache = config.get(CONF_IMAGE_DISK_CACHE, False)
+        self._fetcher = NMCFetcher(
+            self.session, config.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+            limiter=self.hub.station_limiter, breakers=self.hub.breakers)
+        self._stagger = STAGGER_WINDOW * self.hub.station_phase(self.station_code)
+        self._forecast_schedule = ProductSchedule(UPDATE_INTERVAL)
+        self._hourly_schedule = ProductSchedule(timedelta(hours=1))
+        self._store = Store(hass, STORAGE_VERSION, storage_key(self.station_code))
+        # 每次数据变化时加一，预报视图在两次变化之间共享
+        self.generation = 0
+        self.stats = RefreshStats()
+        self.stats_signal = f"{DOMAIN}_stats_{self.station_code}"
+        self.history = ObservationHistory()
+        self._publish_handle = None
+        self._published_success = True
+        # 由profile_refresh服务设置，线程池中的解析另行分析
+        self.executor_profiler = None
         self.device_info = DeviceInfo(
             identifiers={(DOMAIN, self.station_code)},
             name=name,
@@ -45,39 +140,266 @@ class NMCDataUpdateCoordinator(DataUpdateCoordinator):
             model=self.station_code
         )
 
-    async def _get_image(self, html_url):
-        request_data = await self.session.get(html_url)
-        tree = html.fromstring(await request_data.text())
-        image = tree.xpath('//img[@id="imgpath"]')[0]
+    @callback
+    def async_update_listeners(self) -> None:
+        """Coalesce bursts of updates into one notification of the entities.
+
+        A change of availability is published at once, so failures are not
+        held back behind the delay.
+        """
+        if self.last_update_success != self._published_success:
+            if self._publish_handle is not None:
+                self._publish_handle.cancel()
+            self._async_publish()
+        elif self._publish_handle is None:
+            self._publish_handle = self.hass.loop.call_later(PUBLISH_DELAY, self._async_publish)
+
+    @callback
+    def _async_publish(self) -> None:
+        self._publish_handle = None
+        self._published_success = self.last_update_success
+        super().async_update_listeners()
+
+    @callback
+    def async_schedule_refresh(self) -> None:
+        """Hand the next refresh to the shared scheduler, after refresh_interval."""
+        self._async_cancel_scheduled()
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        self._unsub_scheduled = self.hub.scheduler.async_schedule(
+            self.refresh_interval.total_seconds(), self._async_scheduled_refresh)
+
+    async def _async_scheduled_refresh(self) -> None:
+        self._unsub_scheduled = None
+        await self.async_refresh()
+        self.async_schedule_refresh()
+
+    @callback
+    def _async_cancel_scheduled(self) -> None:
+        if self._unsub_scheduled is not None:
+            self._unsub_scheduled()
+            self._unsub_scheduled = None
+
+    async def async_shutdown(self) -> None:
+        self._async_cancel_scheduled()
+        if self._publish_handle is not None:
+            self._publish_handle.cancel()
+            self._publish_handle = None
+        await super().async_shutdown()
+
+    async def async_restore(self) -> bool:
+        """Load the last good data from disk, returns False if there is none."""
+        try:
+            stored = await self._store.async_load()
+        except NotImplementedError:
+            # 旧版本的缓存格式不兼容，直接丢弃
+            _LOGGER.debug("discard cached data of an old version")
+            return False
+        except Exception:
+            _LOGGER.exception("load cached data failed")
+            return False
+        if not stored or DATA_FORECAST not in stored or DATA_FORECAST_HOURLY not in stored:
+            return False
+
+        if (history := stored.pop(STORE_HISTORY, None)) is not None:
+            self.history = ObservationHistory.from_dict(history)
+        # 存储中的时间为字符串，恢复为datetime
+        stored[DATA_FORECAST] = StationForecast.from_dict(stored[DATA_FORECAST])
+        if history is None:
+            self.history.merge(stored[DATA_FORECAST].passed)
+        for predict in stored[DATA_FORECAST_HOURLY]:
+            predict[ATTR_FORECAST_TIME] = datetime.fromisoformat(
+                predict[ATTR_FORECAST_TIME])
+        for _, data_key, _, _ in IMAGE_PAGES:
+            if (image := stored.get(data_key)) is not None:
+                stored[data_key] = ImageData.from_dict(image)
+        stored.update(build_views(stored[DATA_FORECAST]))
+        stored[DATA_NOWCAST] = build_nowcast(
+            stored[DATA_FORECAST], stored[DATA_FORECAST_HOURLY], china_now())
+
+        # 重启前已知的预警不再重复通知
+        self.hub.alerts.async_update(self.station_code, stored[DATA_FORECAST].warning, fire=False)
+
+        self.generation += 1
+        # 错开各站点启动后的第一次刷新
+        self.refresh_interval = max(self._stagger, timedelta(seconds=1))
+        self.async_set_updated_data(stored)
+        return True
+
+    @callback
+    def async_expire(self) -> None:
+        """Make every product due and unknown, so the next refresh fetches and parses all of them."""
+        self._forecast_schedule.next_poll = None
+        self._hourly_schedule.next_poll = None
+        self._fetcher.forget()
+        for conf_key, _, url, _ in IMAGE_PAGES:
+            if conf_key in self._images:
+                self.hub.expire(url)
+
+    def _parse_hourly_page(self, body, encoding):
+        if (profiler := self.executor_profiler) is not None:
+            return profiler.runcall(parse_hourly_page, body, encoding)
+        return parse_hourly_page(body, encoding)
+
+    def _data_to_store(self):
         return {
-            "url": image.attrib["src"],
-            "update_time": datetime.strptime(f"{datetime.now().year}/{image.attrib['data-time']}", "%Y/%m/%d %H:%M")
+            **{key: asdict(value) if is_dataclass(value) else value
+               for key, value in self.data.items() if key not in DERIVED_KEYS},
+            STORE_HISTORY: self.history.as_dict(),
         }
 
-    async def _async_update_data(self):
-        # 预报信息
+    def _last(self, data_key):
+        if self.data is None:
+            return None
+        return self.data.get(data_key)
+
+    @staticmethod
+    def _too_stale(forecast, now):
+        return forecast.publish_time is not None and now - forecast.publish_time > MAX_STALE
+
+    async def _get_forecast(self, now):
+        last_forecast = self._last(DATA_FORECAST)
+        last_hourly = self._last(DATA_FORECAST_HOURLY)
+        stats = self.stats
+        if last_forecast is not None and last_hourly is not None and not self._forecast_schedule.due(now):
+            stats.record_hit(DATA_FORECAST)
+            # 每小时预报按自己的节奏更新，使用上次预报中的页面地址
+            return {DATA_FORECAST: last_forecast,
+                    DATA_FORECAST_HOURLY: await self._get_hourly(
+                        last_forecast, last_hourly, now, self._hourly_schedule.due(now))}
+
         data = {}
-        request_data = await self.session.get(f"http://www.nmc.cn/rest/weather?stationid={self.station_code}")
-        forecast = await request_data.json()
-        data[DATA_FORECAST] = forecast["data"]
-
-        # 网页每小时预报
-        url = forecast["data"]["predict"]["station"]["url"]
-        request_data = await self.session.get(urljoin("http://www.nmc.cn", url))
-        data[DATA_FORECAST_HOURLY] = await request_data.text()
-
-        # 图片
-        images = [
-            (CONF_IMAGE_MAX_TEMPERATURE24, DATA_MAX_TEMPERATURE24,
-             "http://www.nmc.cn/publish/temperature/hight/24hour.html"),
-            (CONF_IMAGE_PRECIPITATION24, DATA_PRECIPITATION24,
-             "http://www.nmc.cn/publish/precipitation/1-day.html"),
-            (CONF_IMAGE_RADAR, DATA_RADAR,
-             "http://nmc.cn/publish/radar/chinaall.html"),
-            (CONF_IMAGE_TEMPERATURE_HOURLY, DATA_TEMPERATURE_HOURLY,
-             "http://nmc.cn/publish/observations/hourly-temperature.html")
+        # 预报信息，未变化时沿用上次结果
+        url = f"{BASE_URL}/rest/weather?stationid={self.station_code}"
+        try:
+            with stats.timer(DATA_FORECAST, "fetch"):
+                text = await self._fetcher.async_get(
+                    url, self._request_timeout, conditional=last_forecast is not None)
+            stats.record_size(DATA_FORECAST, self._fetcher.sizes.get(url))
+            stats.record_hit(DATA_FORECAST, text is None)
+            if text is None:
+                data[DATA_FORECAST] = last_forecast
+            else:
+                with stats.timer(DATA_FORECAST, "decode"):
+                    data[DATA_FORECAST] = StationForecast.from_json(json_loads(text)["data"])
+        except Exception as err:
+            stats.record_error(DATA_FORECAST, err)
+            self._forecast_schedule.record_failure(now)
+            # 站点故障时继续使用上次的数据，按自己的节奏重试
+            if last_forecast is None or last_hourly is None or self._too_stale(last_forecast, now):
+                raise
+            _LOGGER.warning("update forecast failed, keep last result: %r", err)
+            return {DATA_FORECAST: last_forecast, DATA_FORECAST_HOURLY: last_hourly}
+        self._forecast_schedule.record(data[DATA_FORECAST].publish_time, now)
+
+        # 网页每小时预报随预报发布更新
+        due = (last_hourly is None or last_forecast is None
+               or data[DATA_FORECAST].predict_publish_time != last_forecast.predict_publish_time
+               or self._hourly_schedule.due(now))
+        data[DATA_FORECAST_HOURLY] = await self._get_hourly(
+            data[DATA_FORECAST], last_hourly, now, due)
+        return data
+
+    async def _get_hourly(self, forecast, last_hourly, now, due):
+        """Fetch the hourly forecast page if due, parsing it in an executor."""
+        stats = self.stats
+        if not due:
+            stats.record_hit(DATA_FORECAST_HOURLY)
+            return last_hourly
+
+        url = urljoin(BASE_URL, forecast.station_url)
+        schedule = self._hourly_schedule
+        try:
+            # 先比较整页哈希，页面变化时才在线程池中构建DOM并解析
+            with stats.timer(DATA_FORECAST_HOURLY, "fetch"):
+                page = await self._fetcher.async_get_body(
+                    url, self._request_timeout, conditional=last_hourly is not None)
+            stats.record_size(DATA_FORECAST_HOURLY, self._fetcher.sizes.get(url))
+            stats.record_hit(DATA_FORECAST_HOURLY, page is None)
+            if page is None:
+                # 页面没有发布时间，以发现内容变化的时间学习更新节奏
+                schedule.record(schedule.last_published, now)
+                return last_hourly
+            with stats.timer(DATA_FORECAST_HOURLY, "parse"):
+                hourly = await self.hass.async_add_executor_job(
+                    self._parse_hourly_page, *page)
+            schedule.record(now, now)
+            return hourly
+        except Exception as err:
+            stats.record_error(DATA_FORECAST_HOURLY, err)
+            schedule.record_failure(now)
+            if last_hourly is None:
+                raise
+            _LOGGER.warning("update hourly forecast failed, keep last result: %r", err)
+            return last_hourly
+
+    async def _get_image(self, data_key, url, interval):
+        with self.stats.timer(data_key, "fetch"):
+            result = await self.hub.async_get_image(url, interval, self._request_timeout)
+        self.stats.record_hit(data_key, result is self._last(data_key))
+        self.stats.record_size(data_key, self.hub.response_size(url))
+        return result
+
+    def _schedule_next_update(self, image_urls, now):
+        """Wake up just after the earliest expected publication."""
+        next_polls = [
+            self._forecast_schedule.next_poll,
+            self._hourly_schedule.next_poll,
+            *(self.hub.next_poll(url) for url in image_urls)
         ]
-        for conf_key, data_key, url in images:
-            if conf_key in self._images:
-                data[data_key] = await self._get_image(url)
+        next_poll = min((p for p in next_polls if p is not None), default=None)
+        if next_poll is None:
+            self.refresh_interval = UPDATE_INTERVAL
+            return
+        self.refresh_interval = min(
+            max(next_poll - now + self._stagger, MIN_UPDATE_INTERVAL), UPDATE_INTERVAL)
+
+    async def _async_update_data(self):
+        images = [(data_key, url, interval) for conf_key, data_key, url, interval in IMAGE_PAGES
+                  if conf_key in self._images]
+        now = china_now()
+        start = time.perf_counter()
+
+        forecast, *results = await asyncio.gather(
+            self._get_forecast(now),
+            *(self._get_image(data_key, url, interval)
+              for data_key, url, interval in images),
+            return_exceptions=True
+        )
+        self.stats.refresh.record((time.perf_counter() - start) * 1000)
+        # 统计数据每次刷新都会变化，不论数据是否变化都通知诊断实体
+        async_dispatcher_send(self.hass, self.stats_signal)
+        self._schedule_next_update([url for _, url, _ in images], now)
+        if isinstance(forecast, Exception):
+            raise UpdateFailed(f"fetch forecast failed: {forecast!r}") from forecast
+
+        data = forecast
+        # 预报视图只在预报信息变化时计算一次
+        if (last := self._last(DATA_FORECAST)) is not None and data[DATA_FORECAST] is last:
+            data.update({key: self.data[key] for key in VIEW_KEYS})
+        else:
+            data.update(build_views(data[DATA_FORECAST]))
+            # 每次预报带有过去24小时的实况，并入滚动历史
+            self.history.merge(data[DATA_FORECAST].passed)
+            self.hub.alerts.async_update(self.station_code, data[DATA_FORECAST].warning)
+
+        # 派生数值未变化时沿用上次的对象
+        nowcast = build_nowcast(data[DATA_FORECAST], data[DATA_FORECAST_HOURLY], now)
+        if (last := self._last(DATA_NOWCAST)) is not None and last == nowcast:
+            nowcast = last
+        data[DATA_NOWCAST] = nowcast
+
+        # 图片，单张失败不影响整体刷新
+        for (data_key, url, _), result in zip(images, results):
+            if isinstance(result, Exception):
+                self.stats.record_error(data_key, result)
+                _LOGGER.warning("fetch image %s failed: %r", url, result)
+                if (last := self._last(data_key)) is not None:
+                    data[data_key] = last
+                continue
+            data[data_key] = result
+
+        if data != self.data:
+            self.generation += 1
+            self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
         return data
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import math
+from datetime import datetime
+
+from homeassistant.components.weather import (
+    ATTR_FORECAST_NATIVE_TEMP,
+    ATTR_FORECAST_PRECIPITATION,
+    ATTR_FORECAST_TIME,
+    Forecast
+)
+
+from .model import MISSING, StationForecast
+from .scheduler import CHINA_TZ
+
+NOWCAST_PRECIPITATION_TODAY = "precipitation_today"
+NOWCAST_NEXT_RAIN = "next_rain"
+NOWCAST_TEMPERATURE_TREND = "temperature_trend"
+NOWCAST_APPARENT_TEMPERATURE = "apparent_temperature"
+
+TREND_RISING = "rising"
+TREND_FALLING = "falling"
+TREND_STEADY = "steady"
+# 与下一个预报时次相差不足此值视为平稳（℃）
+TREND_THRESHOLD = 0.5
+
+
+def _measured(value):
+    return None if value is None or value == MISSING else value
+
+
+def apparent_temperature(temperature, humidity, wind_speed) -> float | None:
+    """Australian apparent temperature (Steadman), wind speed in m/s."""
+    temperature, humidity, wind_speed = map(_measured, (temperature, humidity, wind_speed))
+    if temperature is None or humidity is None or wind_speed is None:
+        return None
+    vapour_pressure = humidity / 100 * 6.105 * math.exp(
+        17.27 * temperature / (237.7 + temperature))
+    return round(temperature + 0.33 * vapour_pressure - 0.70 * wind_speed - 4.00, 1)
+
+
+def build_nowcast(forecast: StationForecast, hourly: list[Forecast], now: datetime) -> dict:
+    """Values derived from the real observation and the hourly forecast.
+
+    now is naive Beijing time like the hourly forecast times. Precipitation
+    today is the rain observed so far today plus the forecast for the rest of
+    the day. All values are computed in one pass over each list.
+    """
+    precipitation_today = None
+    for observation in forecast.passed:
+        time = observation.time
+        if time is not None and time.date() == now.date() and time <= now \
+                and observation.rain is not None:
+            precipitation_today = (precipitation_today or 0) + observation.rain
+
+    next_rain = None
+    next_temperature = None
+    for predict in hourly:
+        time = predict[ATTR_FORECAST_TIME]
+        if time < now:
+            continue
+        precipitation = predict.get(ATTR_FORECAST_PRECIPITATION)
+        if time.date() == now.date() and precipitation is not None:
+            precipitation_today = (precipitation_today or 0) + precipitation
+        if next_rain is None and precipitation:
+            next_rain = time.replace(tzinfo=CHINA_TZ)
+        if next_temperature is None:
+            next_temperature = predict.get(ATTR_FORECAST_NATIVE_TEMP)
+
+    trend = None
+    temperature = _measured(forecast.temperature)
+    if next_temperature is not None and temperature is not None:
+        delta = next_temperature - temperature
+        trend = TREND_STEADY if abs(delta) < TREND_THRESHOLD else (
+            TREND_RISING if delta > 0 else TREND_FALLING)
+
+    return {
+        NOWCAST_PRECIPITATION_TODAY: round(precipitation_today, 1) if precipitation_today is not None else None,
+        NOWCAST_NEXT_RAIN: next_rain,
+        NOWCAST_TEMPERATURE_TREND: trend,
+        NOWCAST_APPARENT_TEMPERATURE: apparent_temperature(
+            forecast.temperature, forecast.humidity, forecast.wind_speed),
+    }
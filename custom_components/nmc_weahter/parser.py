@@ -0,0 +1,135 @@
+from datetime import datetime, timezone, timedelta
+import re
+from collections import OrderedDict
+from functools import cache
+
+from homeassistant.util import dt as dt_util
+from homeassistant.components.weather import (
+    ATTR_FORECAST_NATIVE_TEMP,
+    ATTR_FORECAST_TIME,
+    ATTR_FORECAST_WIND_BEARING,
+    ATTR_FORECAST_NATIVE_WIND_SPEED,
+    ATTR_FORECAST_PRECIPITATION,
+    ATTR_FORECAST_NATIVE_PRESSURE,
+    ATTR_FORECAST_HUMIDITY,
+    Forecast
+)
+
+
+# lxml在第一次解析页面时才导入，只用缓存数据启动时不加载
+@cache
+def _xpaths():
+    """Precompiled XPaths, compiled once instead of on every parse."""
+    from lxml import etree
+
+    return (
+        etree.XPath('//*[starts-with(@id, "day")]'),
+        etree.XPath(
+            './/div[contains(@class,"weather")][$n]//div[contains(@class, "date")]'),
+        etree.XPath("./div[contains(@class,'hour3')]"),
+    )
+
+
+def get_value(string):
+    matches = re.findall(r"[-+]?\d*\.\d+|\d+", string)
+    if matches:
+        return float(matches[0])
+    return
+
+
+class ImagePageParser:
+    """Find <img id="imgpath"> while streaming and stop as soon as it is seen."""
+
+    def __init__(self, encoding):
+        from lxml import etree
+
+        self._parser = etree.HTMLPullParser(
+            events=("start",), tag="img", encoding=encoding)
+        self._attrib = None
+
+    def feed(self, chunk) -> bool:
+        self._parser.feed(chunk)
+        for _, element in self._parser.read_events():
+            if element.get("id") == "imgpath":
+                self._attrib = dict(element.attrib)
+                return True
+        return False
+
+    def close(self) -> dict:
+        if self._attrib is None:
+            raise ValueError("imgpath not found")
+        return self._attrib
+
+
+def parse_hourly_page(body: bytes, encoding: str) -> list[Forecast]:
+    """Build the DOM of a station page and parse it, run in an executor."""
+    from lxml import html
+
+    tree = html.document_fromstring(body, parser=html.HTMLParser(encoding=encoding))
+    return parse_hourly_forecast(tree)
+
+
+def parse_hourly_forecast(tree) -> list[Forecast]:
+    """Parse the station page DOM into hourly forecasts, run in an executor."""
+    forecast_data = OrderedDict()
+    xpath_days, xpath_date, xpath_hours = _xpaths()
+
+    # 只遍历一次文档，取出day0-day7
+    days = {div.get("id"): div for div in xpath_days(tree)}
+    if (div_days := days.get("day7")) is None:
+        return []
+
+    for i in range(0, 7):
+        div_date = xpath_date(div_days, n=i + 1)
+        if not len(div_date):
+            break
+        matches = re.findall(
+            r'\d+/\d+', div_date[0].text_content().strip())
+        if not matches:
+            break
+        
+        now = dt_util.now(timezone(timedelta(hours=8)))
+
+        # 网页上的bug，第一个当天预报有时不是显示当天日期
+        month_day = datetime.strptime(matches[0], "%m/%d") if i > 0 else now
+        predict_date = month_day.replace(year=now.year if month_day.month >= now.month else now.year + 1).date()
+
+        if (div_day := days.get(f"day{i}")) is None:
+            break
+        for div_hour in xpath_hours(div_day):
+            # 一次遍历取出整行的各列
+            cells = [div.text_content().strip()
+                     for div in div_hour.iterchildren("div")]
+            if len(cells) < 8:
+                continue
+            (time_str, _, precipitation_str, temp_str, wind_speed_str,
+             wind_bearing_str, pressure_str, humidity_str) = cells[:8]
+
+            predict = {}
+
+            if "日" in time_str:
+                day_str, time_str = time_str.split("日")
+                predict_date = predict_date + timedelta(days=1)
+                if predict_date.day != int(day_str):
+                    predict_date = predict_date.replace(day=int(day_str))
+            time = dt_util.parse_time(time_str)
+            predict[ATTR_FORECAST_TIME] = datetime.combine(
+                predict_date, time)
+
+            if "mm" in precipitation_str and (precipitation := get_value(precipitation_str)) is not None:
+                predict[ATTR_FORECAST_PRECIPITATION] = precipitation
+            if "℃" in temp_str and (temp := get_value(temp_str)) is not None:
+                predict[ATTR_FORECAST_NATIVE_TEMP] = temp
+            if "m/s" in wind_speed_str and (wind_speed := get_value(wind_speed_str)) is not None:
+                predict[ATTR_FORECAST_NATIVE_WIND_SPEED] = wind_speed
+            if (wind_bearing := get_value(wind_bearing_str)) is not None:
+                predict[ATTR_FORECAST_WIND_BEARING] = wind_bearing
+            if "hPa" in pressure_str and (pressure := get_value(pressure_str)) is not None:
+                predict[ATTR_FORECAST_NATIVE_PRESSURE] = pressure
+            if "%" in humidity_str and (humidity := get_value(humidity_str)) is not None:
+                predict[ATTR_FORECAST_HUMIDITY] = humidity
+
+            # 网页bug，首日预报常常错误，以后续解析的预报为准
+            forecast_data[predict[ATTR_FORECAST_TIME]] = predict
+
+    return list(forecast_data.values())
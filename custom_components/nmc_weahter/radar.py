@@ -0,0 +1,112 @@
+import io
+import struct
+from collections import deque
+from datetime import datetime
+
+# 每帧显示时间（毫秒），最后一帧停留更久
+FRAME_DURATION = 500
+LAST_FRAME_DURATION = 1500
+
+GIF_HEADER = b"GIF89a"
+GIF_TRAILER = b"\x3b"
+# 无限循环
+NETSCAPE_LOOP = b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+
+
+class RadarLoop:
+    """Fixed size ring buffer of radar frames encoded as an animated GIF.
+
+    Every frame is decoded, quantized and LZW encoded once when it is added,
+    and only its GIF image block is kept. The animation is spliced from the
+    kept blocks, so a new frame costs one frame's encoding however many
+    frames are buffered. Old frames are dropped when either the frame count
+    or the memory ceiling is exceeded. add_frame does blocking image work and
+    is meant to run in an executor.
+    """
+
+    def __init__(self, max_frames: int, max_bytes: int):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        # (发布时间, 宽, 高, 图像块)
+        self._frames: deque[tuple[datetime, int, int, bytes]] = deque()
+        self._frames_size = 0
+        self.animation: bytes | None = None
+
+    @property
+    def last_update(self) -> datetime | None:
+        return self._frames[-1][0] if self._frames else None
+
+    @property
+    def size(self) -> int:
+        return self._frames_size + len(self.animation or b"")
+
+    def __len__(self):
+        return len(self._frames)
+
+    def add_frame(self, update_time: datetime, content: bytes) -> bytes:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(content)) as image:
+            frame = image.convert("RGB").quantize(colors=256)
+        try:
+            block = _image_block(frame)
+            width, height = frame.size
+        finally:
+            frame.close()
+        self._frames.append((update_time, width, height, block))
+        self._frames_size += len(block)
+
+        while len(self._frames) > self.max_frames:
+            self._drop_oldest()
+        self.animation = self._splice()
+        # 动画本身也计入内存上限
+        while len(self._frames) > 1 and self.size > self.max_bytes:
+            self._drop_oldest()
+            self.animation = self._splice()
+        return self.animation
+
+    def _drop_oldest(self):
+        _, _, _, block = self._frames.popleft()
+        self._frames_size -= len(block)
+
+    def _splice(self) -> bytes:
+        width = max(frame[1] for frame in self._frames)
+        height = max(frame[2] for frame in self._frames)
+        parts = [GIF_HEADER, struct.pack("<HHBBB", width, height, 0, 0, 0), NETSCAPE_LOOP]
+        last = len(self._frames) - 1
+        for i, (_, _, _, block) in enumerate(self._frames):
+            duration = LAST_FRAME_DURATION if i == last else FRAME_DURATION
+            # 图形控制扩展，时长单位为1/100秒
+            parts.append(struct.pack("<3sBHBB", b"\x21\xf9\x04", 0, duration // 10, 0, 0))
+            parts.append(block)
+        parts.append(GIF_TRAILER)
+        return b"".join(parts)
+
+
+def _image_block(frame) -> bytes:
+    """Encode a palette image as a GIF image block carrying its own color table."""
+    buffer = io.BytesIO()
+    frame.save(buffer, format="GIF")
+    data = buffer.getvalue()
+
+    flags = data[10]
+    pos = 13
+    table = b""
+    if flags & 0x80:
+        table_size = 3 << ((flags & 0x07) + 1)
+        table = data[pos:pos + table_size]
+        pos += table_size
+    # 跳过图像之前的扩展块
+    while data[pos] == 0x21:
+        pos += 2
+        while data[pos]:
+            pos += data[pos] + 1
+        pos += 1
+    descriptor = bytearray(data[pos:pos + 10])
+    pos += 10
+    if table and not descriptor[9] & 0x80:
+        # 全局颜色表改为图像自己的局部颜色表，拼接时各帧互不影响
+        descriptor[9] |= 0x80 | (flags & 0x07)
+    else:
+        table = b""
+    return bytes(descriptor) + table + data[pos:data.rindex(GIF_TRAILER)]
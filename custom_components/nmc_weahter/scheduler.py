@@ -0,0 +1,125 @@
+import heapq
+import itertools
+from datetime import datetime, timedelta, timezone
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+CHINA_TZ = timezone(timedelta(hours=8))
+
+MIN_INTERVAL = timedelta(minutes=2)
+MAX_INTERVAL = timedelta(hours=24)
+MAX_BACKOFF = timedelta(minutes=30)
+# 预计发布时间之后再稍等片刻，避免抢在发布之前请求
+PUBLISH_DELAY = timedelta(minutes=1)
+# 新观测到的发布间隔所占的权重
+LEARNING_RATE = 0.3
+
+
+def china_now() -> datetime:
+    """Naive Beijing time, matching the timestamps nmc.cn publishes."""
+    return dt_util.now(CHINA_TZ).replace(tzinfo=None)
+
+
+class ProductSchedule:
+    """Learn the publication cadence of one product and decide when to poll it.
+
+    Publication times are naive Beijing times as parsed from nmc.cn. After a
+    new publication the next poll is planned just after the expected next one;
+    polls that find nothing new back off exponentially up to MAX_BACKOFF.
+    """
+
+    def __init__(self, interval: timedelta):
+        self.interval = interval
+        self.last_published: datetime | None = None
+        self.next_poll: datetime | None = None
+        self._misses = 0
+        self._failures = 0
+
+    def due(self, now: datetime) -> bool:
+        return self.next_poll is None or now >= self.next_poll
+
+    def record(self, published: datetime | None, now: datetime) -> None:
+        self._failures = 0
+        if published is not None and published != self.last_published:
+            if self.last_published is not None and published > self.last_published:
+                observed = published - self.last_published
+                if MIN_INTERVAL <= observed <= MAX_INTERVAL:
+                    self.interval += (observed - self.interval) * LEARNING_RATE
+            self.last_published = published
+            self._misses = 0
+            expected = published + self.interval + PUBLISH_DELAY
+            if expected > now:
+                self.next_poll = min(expected, now + self.interval)
+                return
+
+        self._misses = min(self._misses + 1, 10)
+        backoff = min(MIN_INTERVAL * 2 ** (self._misses - 1), MAX_BACKOFF)
+        self.next_poll = now + min(backoff, self.interval)
+
+    def record_failure(self, now: datetime) -> None:
+        # 连续失败时逐步拉长重试间隔，不在站点故障时反复请求
+        self._failures = min(self._failures + 1, 10)
+        self.next_poll = now + min(
+            MIN_INTERVAL * 2 ** (self._failures - 1), MAX_BACKOFF)
+
+
+class RefreshScheduler:
+    """One timer driving the refreshes of all stations.
+
+    Stations hand their next refresh to async_schedule instead of arming a
+    timer each. Pending refreshes are kept in a heap and the single timer is
+    armed for the earliest one, so adding a station costs a heap entry.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        # [时刻, 序号, 动作]，取消时动作置为None，到达堆顶时丢弃
+        self._heap: list[list] = []
+        self._counter = itertools.count()
+        self._handle = None
+        self._when = None
+
+    def __len__(self):
+        return sum(1 for entry in self._heap if entry[2] is not None)
+
+    @callback
+    def async_schedule(self, delay: float, action) -> CALLBACK_TYPE:
+        """Run the coroutine function action after delay seconds, returns a cancel callback."""
+        entry = [self.hass.loop.time() + delay, next(self._counter), action]
+        heapq.heappush(self._heap, entry)
+        self._arm()
+
+        @callback
+        def cancel():
+            entry[2] = None
+            self._arm()
+
+        return cancel
+
+    @callback
+    def _arm(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            if self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+            return
+        when = self._heap[0][0]
+        if self._handle is not None:
+            if self._when <= when:
+                return
+            self._handle.cancel()
+        self._when = when
+        self._handle = self.hass.loop.call_at(when, self._run)
+
+    @callback
+    def _run(self):
+        self._handle = None
+        # 事件循环可能按时钟精度稍早唤醒，计划时刻之前的都已到期
+        now = max(self.hass.loop.time(), self._when)
+        while self._heap and self._heap[0][0] <= now:
+            _, _, action = heapq.heappop(self._heap)
+            if action is not None and not self.hass.is_stopping:
+                self.hass.async_create_task(action())
+        self._arm()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+from abc import abstractmethod
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfPrecipitationDepth,
+    UnitOfPressure,
+    UnitOfSpeed,
+    UnitOfTemperature,
+    UnitOfTime
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, DATA_NOWCAST
+from .history import ColumnStats
+from .nowcast import (
+    NOWCAST_APPARENT_TEMPERATURE,
+    NOWCAST_NEXT_RAIN,
+    NOWCAST_PRECIPITATION_TODAY,
+    NOWCAST_TEMPERATURE_TREND,
+    TREND_FALLING,
+    TREND_RISING,
+    TREND_STEADY
+)
+from .stats import RefreshStats
+
+
+@dataclass
+class NMCDiagnosticSensorDescription(SensorEntityDescription):
+    value_fn: Callable[[RefreshStats], float | None] | None = None
+
+
+DIAGNOSTIC_SENSORS = [
+    NMCDiagnosticSensorDescription(
+        key="refresh_duration",
+        name="Refresh Duration",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        value_fn=lambda stats: stats.refresh.last if stats.refresh.count else None,
+    ),
+    NMCDiagnosticSensorDescription(
+        key="cache_hit_rate",
+        name="Cache Hit Rate",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda stats: stats.hit_rate * 100 if stats.hit_rate is not None else None,
+    ),
+    NMCDiagnosticSensorDescription(
+        key="fetch_errors",
+        name="Fetch Errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.errors,
+    ),
+]
+
+
+HISTORY_WINDOW = timedelta(hours=24)
+
+
+@dataclass
+class NMCHistorySensorDescription(SensorEntityDescription):
+    column: str | None = None
+    value_fn: Callable[[ColumnStats], float | None] | None = None
+
+
+HISTORY_SENSORS = [
+    NMCHistorySensorDescription(
+        key="temperature_max_24h",
+        name="Temperature 24h Max",
+        column="temperature",
+        value_fn=lambda stats: stats.max,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NMCHistorySensorDescription(
+        key="temperature_min_24h",
+        name="Temperature 24h Min",
+        column="temperature",
+        value_fn=lambda stats: stats.min,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+    ),
+    NMCHistorySensorDescription(
+        key="temperature_mean_24h",
+        name="Temperature 24h Mean",
+        column="temperature",
+        value_fn=lambda stats: stats.mean,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        suggested_display_precision=1,
+    ),
+    NMCHistorySensorDescription(
+        key="humidity_mean_24h",
+        name="Humidity 24h Mean",
+        column="humidity",
+        value_fn=lambda stats: stats.mean,
+        device_class=SensorDeviceClass.HUMIDITY,
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=0,
+    ),
+    NMCHistorySensorDescription(
+        key="pressure_mean_24h",
+        name="Pressure 24h Mean",
+        column="pressure",
+        value_fn=lambda stats: stats.mean,
+        device_class=SensorDeviceClass.ATMOSPHERIC_PRESSURE,
+        native_unit_of_measurement=UnitOfPressure.HPA,
+        suggested_display_precision=1,
+    ),
+    NMCHistorySensorDescription(
+        key="precipitation_24h",
+        name="Precipitation 24h",
+        column="rain",
+        value_fn=lambda stats: stats.sum,
+        device_class=SensorDeviceClass.PRECIPITATION,
+        native_unit_of_measurement=UnitOfPrecipitationDepth.MILLIMETERS,
+        suggested_display_precision=1,
+    ),
+    NMCHistorySensorDescription(
+        key="wind_speed_max_24h",
+        name="Wind Speed 24h Max",
+        column="wind_speed",
+        value_fn=lambda stats: stats.max,
+        device_class=SensorDeviceClass.WIND_SPEED,
+        native_unit_of_measurement=UnitOfSpeed.METERS_PER_SECOND,
+    ),
+]
+
+
+NOWCAST_SENSORS = [
+    SensorEntityDescription(
+        key=NOWCAST_PRECIPITATION_TODAY,
+        name="Precipitation Today",
+        device_class=SensorDeviceClass.PRECIPITATION,
+        native_unit_of_measurement=UnitOfPrecipitationDepth.MILLIMETERS,
+        suggested_display_precision=1,
+    ),
+    SensorEntityDescription(
+        key=NOWCAST_NEXT_RAIN,
+        name="Next Rain",
+        device_class=SensorDeviceClass.TIMESTAMP,
+    ),
+    SensorEntityDescription(
+        key=NOWCAST_TEMPERATURE_TREND,
+        name="Temperature Trend",
+        device_class=SensorDeviceClass.ENUM,
+        options=[TREND_RISING, TREND_FALLING, TREND_STEADY],
+    ),
+    SensorEntityDescription(
+        key=NOWCAST_APPARENT_TEMPERATURE,
+        name="Apparent Temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    async_add_entities([
+        *(NMCNowcastSensor(coordinator, description) for description in NOWCAST_SENSORS),
+        *(NMCHistorySensor(coordinator, description) for description in HISTORY_SENSORS),
+        *(NMCDiagnosticSensor(coordinator, description) for description in DIAGNOSTIC_SENSORS),
+    ])
+
+
+class NMCCoordinatorSensor(CoordinatorEntity, SensorEntity):
+    """Sensor computed from coordinator data, written only when its state changes."""
+
+    def __init__(self, coordinator, description, kind):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"nmc-{coordinator.config_entry.unique_id}-{kind}-{description.key}"
+        self._attr_device_info = coordinator.device_info
+        self._published = None
+        self._update_values()
+
+    @abstractmethod
+    def _update_values(self):
+        """Set the value and attributes from the coordinator."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._update_values()
+        # 数值、属性和可用性都没有变化时不写入状态机
+        published = (self._attr_native_value,
+                     getattr(self, "_attr_extra_state_attributes", None), self.available)
+        if published == self._published:
+            return
+        self._published = published
+        super()._handle_coordinator_update()
+
+
+class NMCNowcastSensor(NMCCoordinatorSensor):
+    """A value derived by the coordinator on every refresh."""
+
+    def __init__(self, coordinator, description):
+        super().__init__(coordinator, description, "nowcast")
+
+    def _update_values(self):
+        nowcast = self.coordinator.data.get(DATA_NOWCAST)
+        self._attr_native_value = None if nowcast is None else nowcast[self.entity_description.key]
+
+
+class NMCHistorySensor(NMCCoordinatorSensor):
+    """Statistic of the rolling observation history over the last 24 hours."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    # 每个站点7个统计量，需要时再启用
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, description):
+        super().__init__(coordinator, description, "history")
+
+    def _update_values(self):
+        stats = self.coordinator.history.stats(self.entity_description.column, HISTORY_WINDOW)
+        self._attr_native_value = self.entity_description.value_fn(stats)
+        self._attr_extra_state_attributes = {"samples": stats.count}
+
+
+class NMCDiagnosticSensor(NMCCoordinatorSensor):
+    """Refresh statistics of a station, disabled unless the user enables it."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, description):
+        super().__init__(coordinator, description, "diagnostic")
+
+    def _update_values(self):
+        self._attr_native_value = self.entity_description.value_fn(self.coordinator.stats)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(async_dispatcher_connect(
+            self.hass, self.coordinator.stats_signal, self._handle_coordinator_update))
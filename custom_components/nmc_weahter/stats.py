@@ -0,0 +1,122 @@
+from __future__ import annotations
+import bisect
+import contextlib
+import time
+from collections import defaultdict
+
+# 耗时直方图的桶上限（毫秒）
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Fixed bucket latency histogram in milliseconds."""
+
+    __slots__ = ("counts", "count", "total", "max", "last")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean, 2) if self.count else None,
+            "max_ms": round(self.max, 2),
+            "last_ms": round(self.last, 2),
+            "buckets": {f"<={bound}": n for bound, n in zip(BUCKETS, self.counts) if n}
+            | ({"inf": self.counts[-1]} if self.counts[-1] else {}),
+        }
+
+
+class ProductStats:
+    __slots__ = ("timings", "hits", "misses", "errors", "last_error", "size")
+
+    def __init__(self):
+        self.timings: dict[str, Histogram] = defaultdict(Histogram)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.size: int | None = None
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def as_dict(self):
+        return {
+            "timings": {phase: h.as_dict() for phase, h in self.timings.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3) if self.hit_rate is not None else None,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "response_bytes": self.size,
+        }
+
+
+class RefreshStats:
+    """Timings, sizes, cache hits and errors of the products of one station.
+
+    A hit is a refresh that reused the previous result, because the product
+    was not due, the server answered 304 or the body was unchanged.
+    """
+
+    def __init__(self):
+        self.products: dict[str, ProductStats] = defaultdict(ProductStats)
+        self.refresh = Histogram()
+
+    @contextlib.contextmanager
+    def timer(self, product, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.products[product].timings[phase].record(
+                (time.perf_counter() - start) * 1000)
+
+    def record_hit(self, product, hit=True):
+        if hit:
+            self.products[product].hits += 1
+        else:
+            self.products[product].misses += 1
+
+    def record_error(self, product, err):
+        stats = self.products[product]
+        stats.errors += 1
+        stats.last_error = repr(err)
+
+    def record_size(self, product, size):
+        if size is not None:
+            self.products[product].size = size
+
+    @property
+    def errors(self):
+        return sum(p.errors for p in self.products.values())
+
+    @property
+    def hit_rate(self):
+        hits = sum(p.hits for p in self.products.values())
+        total = hits + sum(p.misses for p in self.products.values())
+        return hits / total if total else None
+
+    def as_dict(self):
+        return {
+            "refresh": self.refresh.as_dict(),
+            "products": {name: p.as_dict() for name, p in self.products.items()},
+        }
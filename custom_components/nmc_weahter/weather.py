@@ -1,13 +1,8 @@
-from datetime import datetime, date, timezone, timedelta
-import re
 import logging
-from lxml import html
-from collections import OrderedDict
 
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.util import dt as dt_util
 
 from homeassistant.const import (
     CONF_NAME,
@@ -16,69 +11,30 @@ from homeassistant.const import (
     UnitOfTemperature
 )
 
-from .const import DOMAIN, NAME, DATA_FORECAST, DATA_FORECAST_HOURLY
+from .const import (
+    DOMAIN,
+    NAME,
+    DATA_FORECAST,
+    DATA_FORECAST_DAILY,
+    DATA_FORECAST_HOURLY,
+    DATA_FORECAST_TWICE_DAILY
+)
+from .condition import condition_map
 
 from homeassistant.components.weather import (
-    ATTR_CONDITION_HAIL,
-    ATTR_CONDITION_CLOUDY,
-    ATTR_CONDITION_FOG,
-    ATTR_CONDITION_LIGHTNING_RAINY,
-    ATTR_CONDITION_PARTLYCLOUDY,
-    ATTR_CONDITION_RAINY,
-    ATTR_CONDITION_SNOWY,
-    ATTR_CONDITION_SNOWY_RAINY,
-    ATTR_CONDITION_SUNNY,
-    ATTR_CONDITION_WINDY,
-    ATTR_CONDITION_POURING,
-    ATTR_CONDITION_EXCEPTIONAL,
-    ATTR_FORECAST_CONDITION,
-    ATTR_FORECAST_NATIVE_TEMP,
-    ATTR_FORECAST_NATIVE_TEMP_LOW,
-    ATTR_FORECAST_TIME,
-    ATTR_FORECAST_WIND_BEARING,
-    ATTR_FORECAST_NATIVE_WIND_SPEED,
-    ATTR_FORECAST_PRECIPITATION,
-    ATTR_FORECAST_NATIVE_PRESSURE,
-    ATTR_FORECAST_HUMIDITY,
-    ATTR_FORECAST_IS_DAYTIME,
     WeatherEntityFeature,
     Forecast,
     SingleCoordinatorWeatherEntity
 )
 
-CONDITION_MAP = {
-    '晴': ATTR_CONDITION_SUNNY,
-    '多云': ATTR_CONDITION_CLOUDY,
-    '局部多云': ATTR_CONDITION_PARTLYCLOUDY,
-    '阴': ATTR_CONDITION_CLOUDY,
-    '雾': ATTR_CONDITION_FOG,
-    '中雾': ATTR_CONDITION_FOG,
-    '大雾': ATTR_CONDITION_FOG,
-    '小雨': ATTR_CONDITION_RAINY,
-    '中雨': ATTR_CONDITION_RAINY,
-    '小到中雨': ATTR_CONDITION_RAINY,
-    '阵雨': ATTR_CONDITION_RAINY,
-    '大雨': ATTR_CONDITION_POURING,
-    '暴雨': ATTR_CONDITION_POURING,
-    '小雪': ATTR_CONDITION_SNOWY,
-    '中雪': ATTR_CONDITION_SNOWY,
-    '大雪': ATTR_CONDITION_SNOWY,
-    '暴雪': ATTR_CONDITION_SNOWY,
-    '扬沙': ATTR_CONDITION_FOG,
-    '沙尘': ATTR_CONDITION_FOG,
-    '雷阵雨': ATTR_CONDITION_LIGHTNING_RAINY,
-    '冰雹': ATTR_CONDITION_HAIL,
-    '雨夹雪': ATTR_CONDITION_SNOWY_RAINY,
-    '大风': ATTR_CONDITION_WINDY,
-    '薄雾': ATTR_CONDITION_FOG,
-    '雨': ATTR_CONDITION_RAINY,
-    '雪': ATTR_CONDITION_SNOWY,
-    '9999': ATTR_CONDITION_EXCEPTIONAL,
-
-}
-
 _LOGGER = logging.getLogger(__name__)
 
+FORECAST_TYPES = (
+    ("daily", DATA_FORECAST_DAILY),
+    ("twice_daily", DATA_FORECAST_TWICE_DAILY),
+    ("hourly", DATA_FORECAST_HOURLY),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -92,13 +48,6 @@ async def async_setup_entry(
     )])
 
 
-def get_value(string):
-    matches = re.findall(r"[-+]?\d*\.\d+|\d+", string)
-    if matches:
-        return float(matches[0])
-    return
-
-
 class NMCWeather(SingleCoordinatorWeatherEntity):
 
     _attr_translation_key = "nmc"
@@ -112,27 +61,35 @@ class NMCWeather(SingleCoordinatorWeatherEntity):
         self._name = name
         self._attr_unique_id = f"nmc-{coordinator.config_entry.unique_id}-weather"
         self._attr_device_info = coordinator.device_info
+        self._published_state = self._state_fields()
+        self._published_forecasts = {forecast_type: coordinator.data.get(data_key)
+                                     for forecast_type, data_key in FORECAST_TYPES}
+
+    def _state_fields(self):
+        forecast = self.coordinator.data[DATA_FORECAST]
+        return (self.available, forecast.condition, forecast.temperature, forecast.humidity,
+                forecast.wind_speed, forecast.wind_bearing, forecast.pressure,
+                forecast.aqi, forecast.alert)
 
-    def _condition_map(self, condition):
-        if (c := CONDITION_MAP.get(condition)) is not None:
-            return c
-        if '中雨' in condition:
-            return ATTR_CONDITION_RAINY
-        if '暴雨' in condition:
-            return ATTR_CONDITION_POURING
-        if '雨' in condition:
-            return ATTR_CONDITION_RAINY
-        if '雪' in condition:
-            return ATTR_CONDITION_SNOWY
-        if '沙' in condition:
-            return ATTR_CONDITION_FOG
-        if '云' in condition:
-            return ATTR_CONDITION_CLOUDY
-        if '雾' in condition:
-            return ATTR_CONDITION_FOG
-
-        _LOGGER.error(f'unkown condition: {condition}')
-        return ATTR_CONDITION_EXCEPTIONAL
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state and push forecasts only for what actually changed."""
+        if (state := self._state_fields()) != self._published_state:
+            self._published_state = state
+            self.async_write_ha_state()
+
+        changed = []
+        for forecast_type, data_key in FORECAST_TYPES:
+            forecast = self.coordinator.data.get(data_key)
+            last = self._published_forecasts.get(forecast_type)
+            # 未变化的预报视图是同一个对象，先比较引用
+            if forecast is last or forecast == last:
+                continue
+            self._published_forecasts[forecast_type] = forecast
+            changed.append(forecast_type)
+        if changed:
+            self.coordinator.config_entry.async_create_task(
+                self.hass, self.async_update_listeners(changed))
 
     @property
     def name(self):
@@ -140,12 +97,11 @@ class NMCWeather(SingleCoordinatorWeatherEntity):
 
     @property
     def condition(self):
-        skycon = self.coordinator.data[DATA_FORECAST]['real']['weather']['info']
-        return self._condition_map(skycon)
+        return condition_map(self.coordinator.data[DATA_FORECAST].condition)
 
     @property
     def native_temperature(self):
-        return self.coordinator.data[DATA_FORECAST]['real']['weather']['temperature']
+        return self.coordinator.data[DATA_FORECAST].temperature
 
     @property
     def native_temperature_unit(self):
@@ -153,11 +109,11 @@ class NMCWeather(SingleCoordinatorWeatherEntity):
 
     @property
     def humidity(self):
-        return float(self.coordinator.data[DATA_FORECAST]['real']['weather']['humidity'])
+        return self.coordinator.data[DATA_FORECAST].humidity
 
     @property
     def native_wind_speed(self):
-        return self.coordinator.data[DATA_FORECAST]['real']['wind']['speed']
+        return self.coordinator.data[DATA_FORECAST].wind_speed
 
     @property
     def native_wind_speed_unit(self):
@@ -166,15 +122,11 @@ class NMCWeather(SingleCoordinatorWeatherEntity):
 
     @property
     def wind_bearing(self):
-        return self.coordinator.data[DATA_FORECAST]['real']['wind']['direct']
+        return self.coordinator.data[DATA_FORECAST].wind_bearing
 
     @property
     def native_pressure(self):
-        pressure = self.coordinator.data[DATA_FORECAST]['real']['weather']['airpressure']
-        if pressure != 9999:
-            return pressure
-
-        return self.coordinator.data[DATA_FORECAST]['passedchart'][0]['pressure']
+        return self.coordinator.data[DATA_FORECAST].pressure
 
     @property
     def native_pressure_unit(self):
@@ -187,116 +139,24 @@ class NMCWeather(SingleCoordinatorWeatherEntity):
 
     @property
     def aqi(self):
-        return self.coordinator.data[DATA_FORECAST]['air']['aqi']
+        return self.coordinator.data[DATA_FORECAST].aqi
 
     @property
     def aqi_description(self):
-        return self.coordinator.data[DATA_FORECAST]['air']['aqi']
+        return self.coordinator.data[DATA_FORECAST].aqi
 
     @property
     def alert(self):
-        return self.coordinator.data[DATA_FORECAST]['real']['warn']['alert']
+        return self.coordinator.data[DATA_FORECAST].alert
 
     @callback
     def _async_forecast_twice_daily(self) -> list[Forecast] | None:
-        forecast_data = []
-        for detail in self.coordinator.data[DATA_FORECAST]['predict']['detail'][1:]:
-            time = datetime.strptime(detail['date'], '%Y-%m-%d')
-            for day_time in ("day", "night"):
-                predict = detail[day_time]
-                data_dict = {
-                    ATTR_FORECAST_TIME: time,
-                    ATTR_FORECAST_CONDITION: self._condition_map(predict['weather']['info']),
-                    ATTR_FORECAST_NATIVE_TEMP: predict['weather']['temperature'],
-                    ATTR_FORECAST_WIND_BEARING: predict['wind']['direct'],
-                    ATTR_FORECAST_NATIVE_WIND_SPEED: predict['wind']['power'],
-                    ATTR_FORECAST_IS_DAYTIME: day_time == "day"
-                }
-                forecast_data.append(data_dict)
-        return forecast_data
+        return self.coordinator.data[DATA_FORECAST_TWICE_DAILY]
 
     @callback
     def _async_forecast_daily(self) -> list[Forecast] | None:
-        forecast_data = []
-        for detail in self.coordinator.data[DATA_FORECAST]['predict']['detail'][1:]:
-            time = datetime.strptime(detail['date'], '%Y-%m-%d')
-            temp_day = detail["day"]['weather']['temperature']
-            temp_night = detail["night"]['weather']['temperature']
-            data_dict = {
-                ATTR_FORECAST_TIME: time,
-                ATTR_FORECAST_CONDITION: self._condition_map(detail["day"]['weather']['info']),
-                ATTR_FORECAST_NATIVE_TEMP: max(temp_day, temp_night),
-                ATTR_FORECAST_NATIVE_TEMP_LOW: min(temp_day, temp_night),
-                ATTR_FORECAST_WIND_BEARING: detail["day"]['wind']['direct'],
-                ATTR_FORECAST_NATIVE_WIND_SPEED: detail["day"]['wind']['power'],
-            }
-            forecast_data.append(data_dict)
-        return forecast_data
+        return self.coordinator.data[DATA_FORECAST_DAILY]
 
     @callback
     def _async_forecast_hourly(self) -> list[Forecast] | None:
-        forecast_data = OrderedDict()
-
-        tree = html.fromstring(self.coordinator.data[DATA_FORECAST_HOURLY])
-
-        for i in range(0, 7):
-            div_date = tree.xpath(
-                f'//*[@id="day7"]//div[contains(@class,"weather")][{i+1}]//div[contains(@class, "date")]')
-            if not len(div_date):
-                break
-            matches = re.findall(
-                r'\d+/\d+', div_date[0].text_content().strip())
-            if not matches:
-                break
-            
-            now = dt_util.now(timezone(timedelta(hours=8)))
-
-            # 网页上的bug，第一个当天预报有时不是显示当天日期
-            month_day = datetime.strptime(matches[0], "%m/%d") if i > 0 else now
-            predict_date = month_day.replace(year=now.year if month_day.month >= now.month else now.year + 1).date()
-
-            div_day = tree.xpath(f'//*[@id="day{i}"]')
-            if not len(div_day):
-                break
-            for div_hour in div_day[0].xpath("./div[contains(@class,'hour3')]"):
-                time_str = div_hour.xpath("./div[1]")[0].text_content().strip()
-                precipitation_str = div_hour.xpath(
-                    "./div[3]")[0].text_content().strip()
-                temp_str = div_hour.xpath("./div[4]")[0].text_content().strip()
-                wind_speed_str = div_hour.xpath(
-                    "./div[5]")[0].text_content().strip()
-                wind_bearing_str = div_hour.xpath(
-                    "./div[6]")[0].text_content().strip()
-                pressure_str = div_hour.xpath(
-                    "./div[7]")[0].text_content().strip()
-                humidity_str = div_hour.xpath(
-                    "./div[8]")[0].text_content().strip()
-
-                predict = {}
-
-                if "日" in time_str:
-                    day_str, time_str = time_str.split("日")
-                    predict_date = predict_date + timedelta(days=1)
-                    if predict_date.day != int(day_str):
-                        predict_date = predict_date.replace(day=int(day_str))
-                time = dt_util.parse_time(time_str)
-                predict[ATTR_FORECAST_TIME] = datetime.combine(
-                    predict_date, time)
-
-                if "mm" in precipitation_str and (precipitation := get_value(precipitation_str)) is not None:
-                    predict[ATTR_FORECAST_PRECIPITATION] = precipitation
-                if "℃" in temp_str and (temp := get_value(temp_str)) is not None:
-                    predict[ATTR_FORECAST_NATIVE_TEMP] = temp
-                if "m/s" in wind_speed_str and (wind_speed := get_value(wind_speed_str)) is not None:
-                    predict[ATTR_FORECAST_NATIVE_WIND_SPEED] = wind_speed
-                if (wind_bearing := get_value(wind_bearing_str)) is not None:
-                    predict[ATTR_FORECAST_WIND_BEARING] = wind_bearing
-                if "hPa" in pressure_str and (pressure := get_value(pressure_str)) is not None:
-                    predict[ATTR_FORECAST_NATIVE_PRESSURE] = pressure
-                if "%" in humidity_str and (humidity := get_value(humidity_str)) is not None:
-                    predict[ATTR_FORECAST_HUMIDITY] = humidity
-
-                # 网页bug，首日预报常常错误，以后续解析的预报为准
-                forecast_data[predict[ATTR_FORECAST_TIME]] = predict
-
-        return forecast_data.values()
+        return self.coordinator.data[DATA_FORECAST_HOURLY]
@@ -0,0 +1,352 @@
+"""Replay nmc.cn locally and drive many station coordinators through simulated hours.
+
+Needs the test requirements (pip install -r requirements_test.txt). A local
+aiohttp server stands in for www.nmc.cn, serving either responses recorded
+into a directory or synthetic ones, with configurable latency, jitter and
+error rate. Stations are set up as config entries on a running Home
+Assistant, products are republished on their real cadence in simulated
+time, and every coordinator is refreshed whenever its own refresh_interval
+says so. Simulated time comes from freezegun, so the integration, Home
+Assistant and the stand-in share one clock; the event loop keeps real time,
+which is what refresh durations and loop lag are measured in.
+
+    python scripts/loadsim.py --stations 30 --hours 24 --latency 80 --errors 0.02
+
+Recorded responses, all optional, are read from --recordings:
+    weather.json   body of /rest/weather?stationid=...
+    station.html   a station forecast page
+    image.html     a national product page containing <img id="imgpath">
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from aiohttp import TCPConnector, web
+from aiohttp.abc import AbstractResolver
+from homeassistant.util import dt as dt_util
+
+ROOT = Path(__file__).resolve().parent.parent
+CHINA_TZ = timezone(timedelta(hours=8))
+SIM_START = datetime(2026, 7, 1, 0, 0)
+
+
+def china_now() -> datetime:
+    """Naive Beijing time, frozen and advanced by the simulation."""
+    return dt_util.now(CHINA_TZ).replace(tzinfo=None)
+
+
+class StandIn:
+    """The nmc.cn endpoints used by the integration."""
+
+    def __init__(self, latency=50, jitter=20, errors=0.0, recordings=None):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = errors
+        self.requests = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+        recordings = Path(recordings) if recordings else None
+        self.weather = self._load(recordings, "weather.json")
+        self.station_page = self._load(recordings, "station.html")
+        self.image_page = self._load(recordings, "image.html")
+
+    @staticmethod
+    def _load(directory, name):
+        if directory is None or not (directory / name).is_file():
+            return None
+        return (directory / name).read_text(encoding="utf-8")
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/rest/weather", self._weather)
+        app.router.add_get("/publish/forecast/{station}.html", self._station)
+        app.router.add_get("/publish/{product:.+}.html", self._image_page)
+        app.router.add_get("/img/{name:.+}", self._image)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else "?"
+        self.requests[route] += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if random.random() < self.error_rate:
+            self.errors[route] += 1
+            return web.Response(status=503)
+        response = await handler(request)
+        self.bytes += len(response.body or b"")
+        return response
+
+    def _published(self, minutes):
+        now = china_now()
+        return now - timedelta(minutes=(now.hour * 60 + now.minute) % minutes)
+
+    async def _weather(self, request):
+        station = request.query.get("stationid", "00000")
+        published = self._published(60)
+        if self.weather is not None:
+            data = json.loads(self.weather)
+        else:
+            data = synthetic_weather(station, published)
+        # 发布时间随模拟时钟推进
+        data["data"]["real"]["publish_time"] = published.strftime("%Y-%m-%d %H:%M")
+        data["data"]["predict"]["publish_time"] = self._published(180).strftime("%Y-%m-%d %H:%M")
+        data["data"]["predict"]["station"]["url"] = f"/publish/forecast/{station}.html"
+        return web.json_response(data)
+
+    async def _station(self, request):
+        body = self.station_page or synthetic_station_page(self._published(180))
+        return web.Response(text=body, content_type="text/html")
+
+    async def _image_page(self, request):
+        product = request.match_info["product"]
+        minutes = 6 if "radar" in product else 60
+        published = self._published(minutes)
+        if self.image_page is not None:
+            # 录制页面中的图片地址指向替身服务，而不是image.nmc.cn
+            body = self.image_page.replace("https://image.nmc.cn/product/", "/img/")
+        else:
+            body = (f'<html><body><img id="imgpath" src="/img/{product}/{published:%Y%m%d%H%M}.png" '
+                    f'data-time="{published:%m/%d %H:%M}"/></body></html>')
+        return web.Response(text=body, content_type="text/html")
+
+    async def _image(self, request):
+        return web.Response(body=b"\x89PNG\r\n\x1a\n" + bytes(1024), content_type="image/png")
+
+
+def synthetic_weather(station, published):
+    hour = published.hour
+    day = {"weather": {"info": "多云", "temperature": 20 + hour % 7},
+           "wind": {"direct": "东北风", "power": "3级"}}
+    return {"data": {
+        "real": {
+            "publish_time": "",
+            "weather": {"info": "晴", "temperature": 18 + hour % 9, "humidity": 60,
+                        "airpressure": 1008},
+            "wind": {"speed": 2.3, "direct": "东风"},
+            "warn": {"alert": "9999"},
+        },
+        "predict": {
+            "publish_time": "",
+            "station": {"url": ""},
+            "detail": [{"date": (published + timedelta(days=i)).strftime("%Y-%m-%d"),
+                        "day": day, "night": day} for i in range(7)],
+        },
+        "air": {"aqi": 42},
+        "passedchart": [{"time": (published - timedelta(hours=i)).strftime("%Y-%m-%d %H:%M"),
+                         "temperature": 18 + (hour - i) % 9, "pressure": 1008,
+                         "humidity": 60, "rain1h": 0, "windSpeed": 2.3,
+                         "windDirection": 90} for i in range(24)],
+    }}
+
+
+def synthetic_station_page(published):
+    parts = ['<html><body><div id="day7">']
+    for i in range(7):
+        day = published + timedelta(days=i)
+        parts.append(f'<div class="weather"><div class="date">{day.month}/{day.day}</div></div>')
+    parts.append("</div>")
+    for i in range(7):
+        parts.append(f'<div id="day{i}">')
+        for h in range(8):
+            cells = [f"{h * 3 + 2:02d}:00", "", "0.5mm", f"{20 + h}℃", "3.3m/s",
+                     "东北风 45°", "1005.2hPa", "77%"]
+            parts.append('<div class="hour3">' + "".join(f"<div>{c}</div>" for c in cells) + "</div>")
+        parts.append("</div>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+class LoopLag:
+    """Measure how late the event loop wakes a sleeping task."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append((loop.time() - start - self.interval) * 1000)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))], 1)
+
+
+async def async_simulate(hass, stand_in, stations, hours, step=1, tick=0.0, images=False):
+    """Set up stations as config entries and refresh them through simulated hours.
+
+    Requests to nmc.cn must already reach the stand-in, see StandInResolver.
+    Entries are unloaded again before the report is returned.
+    """
+    from freezegun import freeze_time
+    from homeassistant.const import CONF_NAME
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+    from custom_components.nmc_weahter.const import (
+        CONF_IMAGES, CONF_IMAGE_RADAR, CONF_IMAGE_PRECIPITATION24, CONF_STATION_CODE, DOMAIN)
+
+    loop = asyncio.get_running_loop()
+    latencies = []
+    failures = 0
+    # 事件循环、速率限制和熔断按真实时间计算：冻结的时钟会让等待令牌的请求永远等下去，
+    # 推进模拟时间又会让请求超时。测试环境中事件循环经patch_time读取时钟
+    ignore = ["custom_components.nmc_weahter.fetcher", "pytest_homeassistant_custom_component.patch_time"]
+    with freeze_time(SIM_START.replace(tzinfo=CHINA_TZ), real_asyncio=True, ignore=ignore) as frozen:
+        entries = []
+        for i in range(stations):
+            code = f"{54000 + i:05d}"
+            entry = MockConfigEntry(domain=DOMAIN, unique_id=code, title=code, data={
+                CONF_NAME: f"station {i}", CONF_STATION_CODE: code,
+                CONF_IMAGES: [CONF_IMAGE_RADAR, CONF_IMAGE_PRECIPITATION24] if images else []})
+            entry.add_to_hass(hass)
+            await hass.config_entries.async_setup(entry.entry_id)
+            entries.append(entry)
+        await hass.async_block_till_done()
+        coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries
+                        if entry.entry_id in hass.data.get(DOMAIN, {})]
+        # 首次刷新在设置时完成，之后按各自的更新间隔刷新
+        next_due = {c: china_now() + c.refresh_interval for c in coordinators}
+
+        async def refresh(coordinator):
+            nonlocal failures
+            # 模拟时间被冻结，耗时按事件循环的真实时间计算
+            start = loop.time()
+            await coordinator.async_refresh()
+            latencies.append((loop.time() - start) * 1000)
+            if not coordinator.last_update_success:
+                failures += 1
+            next_due[coordinator] = china_now() + coordinator.refresh_interval
+
+        lag = LoopLag()
+        lag.start()
+        cpu_start = time.process_time()
+        wall_start = loop.time()
+        step = timedelta(minutes=step)
+        end = SIM_START + timedelta(hours=hours)
+        while china_now() < end:
+            now = china_now()
+            due = [c for c in coordinators if next_due[c] <= now]
+            await asyncio.gather(*(refresh(c) for c in due))
+            if tick:
+                await asyncio.sleep(tick)
+            frozen.tick(step)
+        lag.stop()
+        wall = loop.time() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        for entry in entries:
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    return {
+        "stations": stations,
+        "loaded_stations": len(coordinators),
+        "simulated_hours": hours,
+        "wall_seconds": round(wall, 1),
+        "cpu_seconds": round(cpu, 1),
+        "cpu_percent": round(cpu / wall * 100, 1) if wall else None,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "refreshes": len(latencies),
+        "failed_refreshes": failures,
+        "refresh_ms": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+                       "p99": percentile(latencies, 0.99), "max": percentile(latencies, 1.0),
+                       "mean": round(statistics.fmean(latencies), 1) if latencies else None},
+        "loop_lag_ms": {"p50": percentile(lag.samples, 0.5), "p99": percentile(lag.samples, 0.99),
+                        "max": percentile(lag.samples, 1.0)},
+        "requests": dict(stand_in.requests),
+        "server_errors": dict(stand_in.errors),
+        "response_mb": round(stand_in.bytes / 1024 / 1024, 2),
+    }
+
+
+class StandInResolver(AbstractResolver):
+    """Resolve www.nmc.cn and image.nmc.cn to the stand-in on localhost."""
+
+    def __init__(self, port):
+        self.port = port
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{"hostname": host, "host": "127.0.0.1", "port": self.port,
+                 "family": socket.AF_INET, "proto": 0, "flags": socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+
+async def run(args):
+    port = args.port or _free_port()
+    sys.path.insert(0, str(ROOT))
+
+    from pytest_homeassistant_custom_component.common import async_test_home_assistant
+    from homeassistant import loader
+
+    stand_in = StandIn(args.latency, args.jitter, args.errors, args.recordings)
+    runner = web.AppRunner(stand_in.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="nmc-loadsim-") as config_dir:
+            # Home Assistant的共享会话经此连接器把所有请求发往替身服务
+            connector = TCPConnector(resolver=StandInResolver(port))
+            with patch("homeassistant.helpers.aiohttp_client._async_get_connector",
+                       return_value=connector):
+                async with async_test_home_assistant(storage_dir=config_dir) as hass:
+                    # 与测试相同，允许加载custom_components中的集成
+                    hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+                    report = await async_simulate(
+                        hass, stand_in, args.stations, args.hours, args.step, args.tick, args.images)
+                    await hass.async_stop(force=True)
+            await connector.close()
+    finally:
+        await runner.cleanup()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--hours", type=float, default=6, help="simulated hours")
+    parser.add_argument("--step", type=float, default=1, help="simulated minutes per tick")
+    parser.add_argument("--tick", type=float, default=0.0, help="real seconds to sleep per tick")
+    parser.add_argument("--latency", type=float, default=50, help="mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=20, help="latency standard deviation in ms")
+    parser.add_argument("--errors", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--images", action="store_true", help="also poll radar and precipitation pages")
+    parser.add_argument("--recordings", help="directory with recorded responses")
+    parser.add_argument("--port", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Tests of the nmc_weather integration."""
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(name) -> str:
+    """Responses of www.nmc.cn kept under tests/fixtures."""
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def assert_mean_below(benchmark, seconds):
+    """Fail the run when a benchmark regresses past its threshold."""
+    # --benchmark-disable 时只运行一次，没有统计数据
+    if benchmark.stats is None:
+        return
+    mean = benchmark.stats.stats.mean
+    assert mean < seconds, f"{benchmark.name}: mean {mean * 1000:.2f}ms exceeds {seconds * 1000:.2f}ms"
@@ -0,0 +1,119 @@
+"""Fixtures shared by the tests, including a local stand-in for www.nmc.cn."""
+import asyncio
+import json
+import socket
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+from aiohttp import TCPConnector, web
+from aiohttp.abc import AbstractResolver
+from aiohttp.test_utils import TestServer
+
+from custom_components.nmc_weahter.fetcher import RateLimiter
+from custom_components.nmc_weahter.hub import async_get_hub
+
+from . import load_fixture
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(4096)
+
+
+class StandInResolver(AbstractResolver):
+    """Resolve every host, www.nmc.cn and image.nmc.cn alike, to the local stand-in."""
+
+    def __init__(self):
+        self.port = None
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{"hostname": host, "host": "127.0.0.1", "port": self.port,
+                 "family": socket.AF_INET, "proto": 0, "flags": socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+
+class StandIn:
+    """Serves the recorded responses on the paths www.nmc.cn uses.
+
+    With changing set every response differs from the previous one, so the
+    integration cannot short-circuit on unchanged bodies.
+    """
+
+    def __init__(self):
+        self.weather = json.loads(load_fixture("weather.json"))
+        self.station_page = load_fixture("station.html")
+        self.image_page = load_fixture("image.html")
+        self.changing = False
+        self.revision = 0
+        self.requests = Counter()
+        # (路径, 事件循环时间)，用于检查请求的时机
+        self.log = []
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/rest/weather", self._weather)
+        app.router.add_get("/publish/forecast/{province}/{station}.html", self._station)
+        app.router.add_get("/publish/{product:.+}.html", self._image_page)
+        app.router.add_get("/product/{name:.+}", self._image)
+        return app
+
+    def _count(self, request):
+        route = request.match_info.route.resource.canonical
+        self.requests[route] += 1
+        self.log.append((request.path_qs, asyncio.get_running_loop().time()))
+        if self.changing:
+            self.revision += 1
+
+    async def _weather(self, request):
+        self._count(request)
+        data = self.weather
+        if self.revision:
+            data = {**data, "revision": self.revision}
+        return web.json_response(data, dumps=lambda d: json.dumps(d, ensure_ascii=False))
+
+    async def _station(self, request):
+        self._count(request)
+        return web.Response(text=f"{self.station_page}<!-- {self.revision} -->", content_type="text/html")
+
+    async def _image_page(self, request):
+        self._count(request)
+        # 替身服务不支持https
+        body = self.image_page.replace("https://image.nmc.cn/", "http://image.nmc.cn/")
+        return web.Response(text=body, content_type="text/html")
+
+    async def _image(self, request):
+        self._count(request)
+        return web.Response(body=IMAGE, content_type="image/png")
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+async def stand_in_resolver(hass, socket_enabled):
+    """Send the requests of Home Assistant's shared session to a local port."""
+    resolver = StandInResolver()
+    connector = TCPConnector(resolver=resolver)
+    with patch("homeassistant.helpers.aiohttp_client._async_get_connector",
+               return_value=connector):
+        yield resolver
+    await connector.close()
+
+
+@pytest.fixture
+async def nmc_server(stand_in_resolver):
+    stand_in = StandIn()
+    server = TestServer(stand_in.app(), host="127.0.0.1")
+    await server.start_server()
+    stand_in_resolver.port = server.port
+    yield stand_in
+    await server.close()
+
+
+@pytest.fixture
+async def no_rate_limit(hass, stand_in_resolver):
+    """Lift the shared station rate limit, which is politeness towards nmc.cn
+    and would otherwise dominate what the tests measure."""
+    async_get_hub(hass).station_limiter = RateLimiter(1000, 1000, 4)
@@ -0,0 +1,90 @@
+"""Alert events fired once per alert across the stations of a region."""
+from pytest_homeassistant_custom_component.common import async_capture_events
+
+from custom_components.nmc_weahter.alert import Alert, AlertIndex
+from custom_components.nmc_weahter.const import EVENT_ALERT
+
+# 预警页面地址中的地区和类型编码
+CODES = {"暴雨": "11000041600000", "大风": "11000041100000"}
+
+
+def _alert(level, issued, type="暴雨"):
+    return Alert.from_json({
+        "alert": f"北京市气象台发布{type}{level}预警",
+        "signaltype": type,
+        "signallevel": level,
+        "province": "北京市",
+        "city": "北京",
+        "issuecontent": "9999",
+        "url": f"/publish/alarm/{CODES[type]}_{issued}.html",
+    })
+
+
+def _actions(events):
+    return [(e.data["action"], e.data["level"], e.data["previous_level"]) for e in events]
+
+
+async def test_alert_transitions(hass):
+    events = async_capture_events(hass, EVENT_ALERT)
+    index = AlertIndex(hass)
+    blue = _alert("蓝色", "20260701080000")
+    assert blue.issue_time.hour == 8
+    assert blue.content is None
+
+    # 同一地区的两个站点报同一条预警，只通知一次
+    index.async_update("54511", blue)
+    index.async_update("54416", blue)
+    index.async_update("54511", blue)
+    assert _actions(events) == [("new", "蓝色", None)]
+
+    orange = _alert("橙色", "20260701100000")
+    index.async_update("54511", orange)
+    # 另一个站点稍后报同一条新预警，不再重复通知
+    index.async_update("54416", orange)
+    assert _actions(events)[1:] == [("upgraded", "橙色", "蓝色")]
+    assert index.active == [orange]
+
+    yellow = _alert("黄色", "20260701120000")
+    index.async_update("54416", yellow)
+    # 数据滞后的站点仍报已被替换的橙色预警
+    index.async_update("54511", orange)
+    assert _actions(events)[2:] == [("downgraded", "黄色", "橙色")]
+    assert index.active == [yellow]
+
+    # 更早发布的预警不会替换较新的预警
+    index.async_update("54511", blue)
+    assert index.active == [yellow]
+    assert len(events) == 3
+
+    index.async_update("54511", yellow)
+    index.async_update("54511", None)
+    # 仍有站点报这条预警时不算解除
+    assert len(events) == 3
+    index.async_update("54416", None)
+    await hass.async_block_till_done()
+    assert _actions(events)[3:] == [("cancelled", "黄色", None)]
+    assert index.active == []
+
+
+async def test_same_level_update_and_seeding(hass):
+    events = async_capture_events(hass, EVENT_ALERT)
+    index = AlertIndex(hass)
+    # 重启后载入已知的预警，不重复通知
+    index.async_update("54511", _alert("黄色", "20260701080000"), fire=False)
+    assert events == []
+    index.async_update("54511", _alert("黄色", "20260701090000"))
+    # 不同类型的预警各自独立
+    index.async_update("54416", _alert("蓝色", "20260701090000", type="大风"))
+    await hass.async_block_till_done()
+    assert _actions(events) == [("updated", "黄色", "黄色"), ("new", "蓝色", None)]
+    assert len(index.active) == 2
+
+
+async def test_removed_station_is_not_a_cancellation(hass):
+    events = async_capture_events(hass, EVENT_ALERT)
+    index = AlertIndex(hass)
+    index.async_update("54511", _alert("蓝色", "20260701080000"))
+    index.async_remove_station("54511")
+    await hass.async_block_till_done()
+    assert _actions(events) == [("new", "蓝色", None)]
+    assert index.active == []
@@ -0,0 +1,143 @@
+"""Benchmarks with regression thresholds, run against the local stand-in.
+
+Thresholds are generous multiples of what a laptop measures, so they catch
+regressions in kind (a parse on every refresh, a lost cache) rather than
+noise. Coroutines are benchmarked from a worker thread while the event loop
+stays free to run them.
+"""
+import asyncio
+import gc
+import tracemalloc
+
+from lxml import html
+
+from custom_components.nmc_weahter.condition import CONDITION_MAP, condition_map
+from custom_components.nmc_weahter.const import (
+    CONF_IMAGES,
+    CONF_IMAGE_RADAR,
+    CONF_STATION_CODE,
+    DATA_FORECAST_HOURLY
+)
+from custom_components.nmc_weahter.nmc import NMCDataUpdateCoordinator
+from custom_components.nmc_weahter.parser import parse_hourly_forecast, parse_hourly_page
+
+from . import assert_mean_below, load_fixture
+
+ROUNDS = 30
+
+
+def _coordinator(hass, station_code="54511", images=()):
+    return NMCDataUpdateCoordinator(hass, name=station_code, config={
+        CONF_STATION_CODE: station_code, CONF_IMAGES: list(images)})
+
+
+def _make_due(coordinator):
+    coordinator._forecast_schedule.next_poll = None
+    coordinator._hourly_schedule.next_poll = None
+
+
+async def _benchmark_coroutine(hass, benchmark, factory, setup=None):
+    def run():
+        asyncio.run_coroutine_threadsafe(factory(), hass.loop).result()
+
+    await hass.async_add_executor_job(lambda: benchmark.pedantic(
+        run, setup=setup, rounds=ROUNDS, warmup_rounds=1))
+
+
+async def test_update_cached(hass, nmc_server, no_rate_limit, benchmark):
+    """Nothing is due: the refresh returns cached data without a request."""
+    coordinator = _coordinator(hass, images=[CONF_IMAGE_RADAR])
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    requests = sum(nmc_server.requests.values())
+
+    await _benchmark_coroutine(hass, benchmark, coordinator._async_update_data)
+
+    assert sum(nmc_server.requests.values()) == requests
+    await coordinator.async_shutdown()
+    assert_mean_below(benchmark, 0.005)
+
+
+async def test_update_unchanged(hass, nmc_server, no_rate_limit, benchmark):
+    """Everything is due but unchanged: fetched and hashed, never parsed."""
+    coordinator = _coordinator(hass)
+    await coordinator.async_refresh()
+    hourly = coordinator.data[DATA_FORECAST_HOURLY]
+
+    await _benchmark_coroutine(
+        hass, benchmark, coordinator._async_update_data, setup=lambda: _make_due(coordinator))
+
+    assert coordinator.stats.products[DATA_FORECAST_HOURLY].timings["parse"].count == 1
+    assert coordinator._last(DATA_FORECAST_HOURLY) is hourly
+    await coordinator.async_shutdown()
+    assert_mean_below(benchmark, 0.05)
+
+
+async def test_update_changed(hass, nmc_server, no_rate_limit, benchmark):
+    """Every response changed: full decode, DOM build and parse per refresh."""
+    coordinator = _coordinator(hass)
+    await coordinator.async_refresh()
+    nmc_server.changing = True
+    updates = 0
+
+    async def update():
+        nonlocal updates
+        updates += 1
+        # 作为上次数据，下一轮比较的是新内容
+        coordinator.data = await coordinator._async_update_data()
+
+    await _benchmark_coroutine(
+        hass, benchmark, update, setup=lambda: _make_due(coordinator))
+
+    # 每轮都重新解析，--benchmark-disable 时只有一轮
+    assert coordinator.stats.products[DATA_FORECAST_HOURLY].timings["parse"].count == updates + 1
+    assert len(coordinator.data[DATA_FORECAST_HOURLY]) > 40
+    await coordinator.async_shutdown()
+    assert_mean_below(benchmark, 0.1)
+
+
+def test_parse_hourly_forecast(benchmark):
+    tree = html.document_fromstring(load_fixture("station.html"))
+    forecasts = benchmark(parse_hourly_forecast, tree)
+    assert len(forecasts) > 40
+    assert_mean_below(benchmark, 0.015)
+
+
+def test_parse_hourly_page(benchmark):
+    body = load_fixture("station.html").encode()
+    forecasts = benchmark(parse_hourly_page, body, "utf-8")
+    assert len(forecasts) > 40
+    assert_mean_below(benchmark, 0.03)
+
+
+def test_condition_map(benchmark):
+    conditions = [*CONDITION_MAP, "小到中雨转暴雨", "阴转多云", "浮尘", "强沙尘暴"]
+
+    def run():
+        for condition in conditions:
+            condition_map(condition)
+
+    benchmark(run)
+    assert_mean_below(benchmark, 0.0005)
+
+
+async def test_memory_per_station(hass, nmc_server, no_rate_limit):
+    """Retained memory of one refreshed station, after shared state exists."""
+    first = _coordinator(hass, "54511")
+    await first.async_refresh()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        coordinator = _coordinator(hass, "54527")
+        await coordinator.async_refresh()
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    assert coordinator.last_update_success
+    await first.async_shutdown()
+    await coordinator.async_shutdown()
+    assert retained < 512 * 1024, f"one station retains {retained / 1024:.0f}KB"
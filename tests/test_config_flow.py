@@ -0,0 +1,40 @@
+"""Searching for a station in the config flow."""
+import time
+from unittest.mock import patch
+
+from homeassistant import config_entries
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.nmc_weahter.const import CONF_SEARCH, CONF_STATION_CODE, DOMAIN
+from custom_components.nmc_weahter.directory import STORAGE_KEY
+
+
+async def test_search_without_results_stays_on_search(hass, hass_storage):
+    # 站点列表来自存储，不访问nmc.cn
+    now = time.time()
+    hass_storage[STORAGE_KEY] = {"version": 1, "key": STORAGE_KEY, "data": {
+        "provinces": {"ABJ": "北京市"},
+        "provinces_updated": now,
+        "stations": {"ABJ": {"updated": now, "stations": [
+            {"code": "54511", "province": "北京市", "city": "北京"}]}},
+    }}
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER})
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_SEARCH: "火星"})
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "search"
+    assert result["errors"] == {"base": "no_results"}
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_SEARCH: "北京"})
+    assert result["step_id"] == "search"
+    assert not result["errors"]
+
+    with patch("custom_components.nmc_weahter.async_setup_entry", return_value=True):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_STATION_CODE: "54511"})
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_STATION_CODE] == "54511"
+    assert result["title"] == "北京市北京"
@@ -0,0 +1,133 @@
+"""Retries, circuit breakers and unchanged responses of the fetcher."""
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+from aiohttp import ClientResponseError
+from freezegun import freeze_time
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from custom_components.nmc_weahter.fetcher import (
+    BREAKER_COOLDOWN,
+    BREAKER_MAX_COOLDOWN,
+    RETRIES,
+    RETRY_BASE_DELAY,
+    CircuitBreaker,
+    CircuitBreakers,
+    CircuitOpenError,
+    NMCFetcher
+)
+
+URL = "http://www.nmc.cn/rest/weather?stationid=54511"
+
+
+def _respond(aioclient_mock, *statuses, text="{}"):
+    """Answer the requests with statuses in turn, the last one repeatedly."""
+    statuses = list(statuses)
+
+    async def side_effect(method, url, data):
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        return AiohttpClientMockResponse(method, url, status=status, text=text)
+
+    aioclient_mock.get(URL, side_effect=side_effect)
+
+
+@pytest.fixture
+def backoff():
+    """Upper bounds of the jittered retry delays, which are not waited for."""
+    bounds = []
+    with patch("custom_components.nmc_weahter.fetcher.random.uniform",
+               side_effect=lambda low, high: bounds.append(high) or 0):
+        yield bounds
+
+
+async def test_retry_with_growing_backoff(hass, aioclient_mock, backoff):
+    _respond(aioclient_mock, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.OK)
+    fetcher = NMCFetcher(async_get_clientsession(hass), 4)
+    assert await fetcher.async_get(URL, 10) == "{}"
+    assert aioclient_mock.call_count == 3
+    assert backoff == [RETRY_BASE_DELAY, RETRY_BASE_DELAY * 2]
+
+
+async def test_give_up_after_retries(hass, aioclient_mock, backoff):
+    _respond(aioclient_mock, HTTPStatus.SERVICE_UNAVAILABLE)
+    breakers = CircuitBreakers()
+    breakers["www.nmc.cn"] = CircuitBreaker("www.nmc.cn", threshold=RETRIES + 1)
+    fetcher = NMCFetcher(async_get_clientsession(hass), 4, breakers=breakers)
+    with pytest.raises(ClientResponseError):
+        await fetcher.async_get(URL, 10)
+    assert aioclient_mock.call_count == RETRIES + 1
+    # 每次失败都计入该主机的熔断器
+    assert breakers["www.nmc.cn"].is_open
+
+
+async def test_client_errors_are_not_retried(hass, aioclient_mock, backoff):
+    _respond(aioclient_mock, HTTPStatus.NOT_FOUND)
+    fetcher = NMCFetcher(async_get_clientsession(hass), 4)
+    with pytest.raises(ClientResponseError):
+        await fetcher.async_get(URL, 10)
+    assert aioclient_mock.call_count == 1
+    assert not backoff
+
+
+async def test_open_circuit_skips_requests(hass, aioclient_mock, backoff):
+    _respond(aioclient_mock, HTTPStatus.SERVICE_UNAVAILABLE)
+    breakers = CircuitBreakers()
+    breakers["www.nmc.cn"] = CircuitBreaker("www.nmc.cn", threshold=2)
+    fetcher = NMCFetcher(async_get_clientsession(hass), 4, breakers=breakers)
+    # 第二次失败后熔断，剩下的重试不再发出请求
+    with pytest.raises(CircuitOpenError):
+        await fetcher.async_get(URL, 10)
+    assert aioclient_mock.call_count == 2
+    with pytest.raises(CircuitOpenError):
+        await fetcher.async_get(URL, 10)
+    assert aioclient_mock.call_count == 2
+
+
+async def test_unchanged_body(hass, aioclient_mock):
+    _respond(aioclient_mock, HTTPStatus.OK)
+    fetcher = NMCFetcher(async_get_clientsession(hass), 4)
+    assert await fetcher.async_get(URL, 10) == "{}"
+    assert await fetcher.async_get(URL, 10) is None
+    fetcher.forget(URL)
+    assert await fetcher.async_get(URL, 10) == "{}"
+
+
+def test_breaker_cooldown_doubles():
+    breaker = CircuitBreaker("www.nmc.cn", threshold=2)
+    with freeze_time("2026-07-01 08:00:00") as frozen:
+        breaker.record_failure()
+        assert not breaker.is_open
+        breaker.record_failure()
+        assert breaker.is_open
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+        cooldown = BREAKER_COOLDOWN
+        while True:
+            frozen.tick(cooldown - 1)
+            assert breaker.is_open
+            frozen.tick(1)
+            assert not breaker.is_open
+            if cooldown == BREAKER_MAX_COOLDOWN:
+                break
+            # 冷却后第一次请求又失败，冷却时间加倍，直到上限
+            breaker.record_failure()
+            cooldown = min(cooldown * 2, BREAKER_MAX_COOLDOWN)
+
+        breaker.record_failure()
+        frozen.tick(BREAKER_MAX_COOLDOWN - 1)
+        assert breaker.is_open
+        frozen.tick(1)
+
+        # 成功后重新计数，冷却时间恢复
+        breaker.record_success()
+        breaker.record_failure()
+        assert not breaker.is_open
+        breaker.record_failure()
+        frozen.tick(BREAKER_COOLDOWN - 1)
+        assert breaker.is_open
+        frozen.tick(1)
+        assert not breaker.is_open
@@ -0,0 +1,69 @@
+"""Merging passedchart batches into the rolling observation history."""
+from datetime import datetime, timedelta
+
+from custom_components.nmc_weahter.history import ObservationHistory
+from custom_components.nmc_weahter.model import Observation
+
+START = datetime(2026, 7, 1, 0, 0)
+
+
+def _observation(hour, temperature, rain=0.0):
+    return Observation(time=START + timedelta(hours=hour), temperature=temperature, pressure=1000.0,
+                       humidity=60.0, rain=rain, wind_speed=2.0, wind_direction=90.0)
+
+
+def _batch(first, last, temperature=lambda hour: float(hour)):
+    # passedchart每次带回最近24小时，相邻两批几乎完全重叠
+    return [_observation(hour, temperature(hour)) for hour in range(first, last + 1)]
+
+
+def test_merge_overlapping_batches():
+    history = ObservationHistory()
+    assert history.merge(_batch(0, 23))
+    assert len(history) == 24
+    assert not history.merge(_batch(0, 23))
+    assert not history.merge([])
+
+    # 新一批覆盖重叠部分并追加一小时，较新的值为准
+    assert history.merge(_batch(1, 24, temperature=lambda hour: hour + 0.5))
+    assert len(history) == 25
+    assert history.last_time == START + timedelta(hours=24)
+    assert history.stats("temperature", timedelta(hours=1)).max == 24.5
+    assert history.stats("temperature", timedelta(days=2)).min == 0.0
+
+
+def test_merge_drops_old_rows():
+    history = ObservationHistory(max_age=timedelta(days=1))
+    history.merge(_batch(0, 23))
+    history.merge(_batch(24, 47))
+    assert len(history) == 25
+    assert history.stats("temperature", timedelta(days=7)).min == 23.0
+
+
+def test_window_stats():
+    history = ObservationHistory()
+    observations = _batch(0, 23)
+    observations[22] = _observation(22, None, rain=1.5)
+    observations[23] = _observation(23, 30.0, rain=2.5)
+    history.merge(observations)
+
+    # 窗口不含起点：最后三小时为21、22、23时，22时气温缺测
+    stats = history.stats("temperature", timedelta(hours=3))
+    assert (stats.count, stats.min, stats.max, stats.mean, stats.sum) == (2, 21.0, 30.0, 25.5, 51.0)
+    assert history.stats("rain", timedelta(hours=3)).sum == 4.0
+    # 以更早的时刻为终点
+    stats = history.stats("temperature", timedelta(hours=2), end=START + timedelta(hours=10))
+    assert (stats.count, stats.min, stats.max) == (2, 9.0, 10.0)
+    assert history.stats("temperature", timedelta(hours=1), end=START - timedelta(hours=1)).count == 0
+    assert ObservationHistory().stats("temperature", timedelta(hours=1)).mean is None
+
+
+def test_round_trip():
+    history = ObservationHistory()
+    observations = _batch(0, 5)
+    observations[2] = _observation(2, None)
+    history.merge(observations)
+    restored = ObservationHistory.from_dict(history.as_dict())
+    assert restored.as_dict() == history.as_dict()
+    assert restored.as_dict()["temperature"][2] is None
+    assert not restored.merge(observations)
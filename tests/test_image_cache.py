@@ -0,0 +1,137 @@
+"""The shared image cache: memory bound, disk tier and request coalescing."""
+import asyncio
+import threading
+from unittest.mock import patch
+
+from homeassistant.const import CONF_NAME
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.nmc_weahter.const import CONF_IMAGE_DISK_CACHE, CONF_STATION_CODE, DOMAIN
+from custom_components.nmc_weahter.hub import async_get_hub
+from custom_components.nmc_weahter.image_cache import NMCImageCache
+
+URL = "http://image.nmc.cn/product/{}.png"
+
+
+def _image(name):
+    # 每张图片100字节，内容互不相同
+    return name.encode().ljust(100, b"\0")
+
+
+def _cache(hass, aioclient_mock, names, max_memory=250, max_disk=1000):
+    for name in names:
+        aioclient_mock.get(URL.format(name), content=_image(name), headers={"Content-Type": "image/png"})
+    return NMCImageCache(hass, async_get_clientsession(hass),
+                         max_memory=max_memory, max_disk=max_disk)
+
+
+async def test_lru_eviction_under_byte_bound(hass, aioclient_mock):
+    cache = _cache(hass, aioclient_mock, "abc")
+    await cache.async_get(URL.format("a"))
+    await cache.async_get(URL.format("b"))
+    # 再次读取a，b成为最久未用的条目
+    assert await cache.async_get(URL.format("a")) == (_image("a"), "image/png")
+    await cache.async_get(URL.format("c"))
+    assert cache.as_dict()["memory_bytes"] <= 250
+    assert aioclient_mock.call_count == 3
+
+    await cache.async_get(URL.format("a"))
+    assert aioclient_mock.call_count == 3
+    assert await cache.async_get(URL.format("b")) == (_image("b"), "image/png")
+    assert aioclient_mock.call_count == 4
+
+
+async def test_disk_spill_and_read_back(hass, aioclient_mock, tmp_path):
+    path = tmp_path / "images"
+    cache = _cache(hass, aioclient_mock, "abc")
+    await cache.async_set_disk(str(path))
+    for name in "abc":
+        await cache.async_get(URL.format(name))
+    assert cache.as_dict()["disk_entries"] == 1
+    assert len(list(path.iterdir())) == 1
+
+    # a从磁盘读回内存，不再请求
+    assert await cache.async_get(URL.format("a")) == (_image("a"), "image/png")
+    assert aioclient_mock.call_count == 3
+    assert cache.hits == 1
+
+    await cache.async_set_disk(None)
+    assert not path.exists()
+    assert cache.as_dict()["disk_entries"] == 0
+
+
+async def test_disk_bound(hass, aioclient_mock, tmp_path):
+    path = tmp_path / "images"
+    cache = _cache(hass, aioclient_mock, "abcdef", max_disk=250)
+    await cache.async_set_disk(str(path))
+    for name in "abcdef":
+        await cache.async_get(URL.format(name))
+    stats = cache.as_dict()
+    assert stats["disk_bytes"] <= 250
+    assert len(list(path.iterdir())) == stats["disk_entries"] == 2
+    # 从磁盘淘汰的条目需要重新下载
+    await cache.async_get(URL.format("a"))
+    assert aioclient_mock.call_count == 7
+
+
+async def test_concurrent_gets_share_one_request(hass, aioclient_mock):
+    cache = _cache(hass, aioclient_mock, "a")
+    results = await asyncio.gather(*(cache.async_get(URL.format("a")) for _ in range(5)))
+    assert all(result == (_image("a"), "image/png") for result in results)
+    assert aioclient_mock.call_count == 1
+
+
+async def test_eviction_during_disk_write(hass, aioclient_mock, tmp_path):
+    path = tmp_path / "images"
+    cache = _cache(hass, aioclient_mock, "abcd")
+    await cache.async_set_disk(str(path))
+    await cache.async_get(URL.format("a"))
+    await cache.async_get(URL.format("b"))
+
+    started = threading.Event()
+    release = threading.Event()
+    write_disk = NMCImageCache._write_disk
+
+    def blocked_write(self, *args):
+        started.set()
+        release.wait(5)
+        write_disk(self, *args)
+
+    with patch.object(NMCImageCache, "_write_disk", blocked_write):
+        # c把a挤出内存，a的写入被阻塞
+        fetch_c = hass.async_create_task(cache.async_get(URL.format("c")))
+        await hass.async_add_executor_job(started.wait, 5)
+        # 写入完成前a仍可读取，不会重新下载
+        assert await cache.async_get(URL.format("a")) == (_image("a"), "image/png")
+        assert aioclient_mock.call_count == 3
+        # 写入期间关闭磁盘缓存
+        set_disk = hass.async_create_task(cache.async_set_disk(None))
+        release.set()
+        await fetch_c
+        await set_disk
+
+    assert cache.as_dict()["disk_entries"] == 0
+    assert not path.exists()
+    # 被挤出内存的a没有进入磁盘，之后重新下载
+    assert await cache.async_get(URL.format("a")) == (_image("a"), "image/png")
+    assert aioclient_mock.call_count == 4
+    assert cache.as_dict()["memory_bytes"] <= 250
+
+
+async def test_disk_tier_follows_loaded_entries(hass, nmc_server, no_rate_limit):
+    entries = []
+    for code, disk_cache in (("54511", True), ("54527", False)):
+        entry = MockConfigEntry(domain=DOMAIN, unique_id=code, title=code, data={
+            CONF_NAME: code, CONF_STATION_CODE: code, CONF_IMAGE_DISK_CACHE: disk_cache})
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        entries.append(entry)
+    await hass.async_block_till_done()
+    image_cache = async_get_hub(hass).image_cache
+    assert image_cache.as_dict()["disk_path"] == hass.config.path(DOMAIN, "images")
+
+    # 唯一要求磁盘缓存的站点卸载后，磁盘层随之关闭
+    assert await hass.config_entries.async_unload(entries[0].entry_id)
+    assert image_cache.as_dict()["disk_path"] is None
+    assert await hass.config_entries.async_unload(entries[1].entry_id)
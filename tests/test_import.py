@@ -0,0 +1,36 @@
+"""Import cost of the integration, measured in a fresh interpreter."""
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE = "custom_components.nmc_weahter"
+MODULES = ["", ".nmc", ".sensor", ".weather", ".image", ".config_flow", ".diagnostics"]
+# 只在第一次解析页面、搜索站点或生成动画时才需要
+LAZY = ("lxml", "difflib", "PIL")
+MAX_SELF_MS = 100
+
+
+def _importtime():
+    code = "; ".join(f"import {PACKAGE}{module}" for module in MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            modules[name.strip()] = int(self_us)
+    return modules
+
+
+def test_import_time():
+    modules = _importtime()
+    assert PACKAGE in modules
+
+    lazy = sorted(name for name in modules if name.split(".")[0] in LAZY)
+    assert not lazy, f"imported at load time: {lazy}"
+
+    own = sum(us for name, us in modules.items() if name.startswith(PACKAGE)) / 1000
+    assert own < MAX_SELF_MS, f"integration modules take {own:.0f}ms to import"
@@ -0,0 +1,112 @@
+"""The profile_refresh service and coalesced entity updates."""
+import asyncio
+import dataclasses
+import pstats
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.const import CONF_NAME
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.entity import Entity
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.nmc_weahter import SERVICE_PROFILE_REFRESH
+from custom_components.nmc_weahter.const import (
+    CONF_STATION_CODE,
+    DATA_FORECAST,
+    DATA_FORECAST_HOURLY,
+    DATA_NOWCAST,
+    DOMAIN
+)
+from custom_components.nmc_weahter.nowcast import NOWCAST_APPARENT_TEMPERATURE
+
+PUBLISH_DELAY = 0.02
+
+
+async def _async_setup_station(hass, code="54511"):
+    entry = MockConfigEntry(domain=DOMAIN, unique_id=code, title=code,
+                            data={CONF_NAME: code, CONF_STATION_CODE: code})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry, hass.data[DOMAIN][entry.entry_id]
+
+
+async def test_profile_refresh(hass, nmc_server, no_rate_limit, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    entry, coordinator = await _async_setup_station(hass)
+    parses = coordinator.stats.products[DATA_FORECAST_HOURLY].timings["parse"].count
+    requests = sum(nmc_server.requests.values())
+
+    await hass.services.async_call(
+        DOMAIN, SERVICE_PROFILE_REFRESH, {"entry_id": entry.entry_id}, blocking=True)
+
+    # 缓存不起作用：重新请求并解析
+    assert sum(nmc_server.requests.values()) > requests
+    assert coordinator.stats.products[DATA_FORECAST_HOURLY].timings["parse"].count == parses + 1
+    [path] = tmp_path.glob(f"{DOMAIN}.54511.*.cprof")
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    # 线程池中的解析也在结果中
+    assert "parse_hourly_page" in functions
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_PROFILE_REFRESH, {"entry_id": "unknown"}, blocking=True)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+@pytest.fixture
+def state_writes():
+    """Number of state writes per entity id."""
+    writes = Counter()
+    write_ha_state = Entity.async_write_ha_state
+
+    def count(self):
+        writes[self.entity_id] += 1
+        write_ha_state(self)
+
+    with patch.object(Entity, "async_write_ha_state", count), \
+            patch("custom_components.nmc_weahter.nmc.PUBLISH_DELAY", PUBLISH_DELAY):
+        yield writes
+
+
+async def test_state_writes_are_coalesced(hass, nmc_server, no_rate_limit, state_writes):
+    entry, coordinator = await _async_setup_station(hass)
+    await asyncio.sleep(PUBLISH_DELAY * 2)
+    await hass.async_block_till_done()
+    entities = set(state_writes)
+    assert entities
+
+    # 没有到期的产品，刷新得到相同的数据，不写状态
+    state_writes.clear()
+    await coordinator.async_refresh()
+    await asyncio.sleep(PUBLISH_DELAY * 2)
+    await hass.async_block_till_done()
+    assert not state_writes
+
+    # 一连串变化只在延迟结束后写一次，写入的是最后的数据
+    data = coordinator.data
+    for i in range(5):
+        coordinator.async_set_updated_data({
+            **data,
+            DATA_FORECAST: dataclasses.replace(data[DATA_FORECAST], temperature=20.0 + i),
+            DATA_NOWCAST: {**data[DATA_NOWCAST], NOWCAST_APPARENT_TEMPERATURE: 10.0 + i},
+        })
+    assert not state_writes
+    await asyncio.sleep(PUBLISH_DELAY * 2)
+    await hass.async_block_till_done()
+    assert {"weather.54511", "sensor.apparent_temperature"} <= set(state_writes)
+    assert max(state_writes.values()) == 1
+    assert hass.states.get("weather.54511").attributes["temperature"] == 24.0
+    assert hass.states.get("sensor.apparent_temperature").state == "14.0"
+
+    # 可用性变化立即写入，不等待延迟
+    state_writes.clear()
+    coordinator.last_update_success = False
+    coordinator.async_update_listeners()
+    assert set(state_writes) == entities
+    assert hass.states.get(next(iter(entities))).state == "unavailable"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
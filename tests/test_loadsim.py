@@ -0,0 +1,40 @@
+"""Smoke run of scripts/loadsim.py against a running Home Assistant."""
+import importlib.util
+import sys
+
+from aiohttp.test_utils import TestServer
+
+from custom_components.nmc_weahter.const import DOMAIN
+
+from . import FIXTURES
+
+SCRIPT = FIXTURES.parent.parent / "scripts" / "loadsim.py"
+
+
+def _load_loadsim():
+    spec = importlib.util.spec_from_file_location("loadsim", SCRIPT)
+    module = sys.modules["loadsim"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def test_loadsim(hass, stand_in_resolver, no_rate_limit):
+    loadsim = _load_loadsim()
+    stand_in = loadsim.StandIn(latency=0, jitter=0, recordings=FIXTURES)
+    server = TestServer(stand_in.app(), host="127.0.0.1")
+    await server.start_server()
+    stand_in_resolver.port = server.port
+    try:
+        report = await loadsim.async_simulate(hass, stand_in, 3, 2, step=5, images=True)
+    finally:
+        await server.close()
+
+    assert report["loaded_stations"] == 3
+    assert not hass.data[DOMAIN]
+    assert report["failed_refreshes"] == 0
+    assert report["refreshes"] > 3
+    requests = report["requests"]
+    assert requests["/rest/weather"] >= 3
+    # 全国图片页面由所有站点共享，不随站点数量成倍请求
+    assert requests["/publish/{product}.html"] < requests["/rest/weather"]
+    assert set(report) >= {"refresh_ms", "loop_lag_ms", "cpu_seconds", "max_rss_mb"}
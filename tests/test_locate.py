@@ -0,0 +1,62 @@
+"""The grid index against a brute force scan of every station."""
+import random
+
+import pytest
+
+from custom_components.nmc_weahter.locate import (
+    StationLocation,
+    StationLocator,
+    distance,
+    load_stations
+)
+
+
+def _stations(count, seed=0):
+    rng = random.Random(seed)
+    # 大致覆盖全国范围
+    return [StationLocation(str(i), rng.uniform(18, 53), rng.uniform(73, 135)) for i in range(count)]
+
+
+def _brute_force(stations, latitude, longitude, count):
+    return sorted(distance(latitude, longitude, s.latitude, s.longitude) for s in stations)[:count]
+
+
+@pytest.mark.parametrize(
+    ("latitude_range", "longitude_range"),
+    [((18, 53), (73, 135)), ((-89, 89), (-179, 179))],
+    ids=["inside", "worldwide"],
+)
+def test_nearest_matches_brute_force(latitude_range, longitude_range):
+    stations = _stations(300)
+    locator = StationLocator(stations)
+    rng = random.Random(1)
+    for _ in range(2000):
+        latitude, longitude = rng.uniform(*latitude_range), rng.uniform(*longitude_range)
+        found = [dist for _, dist in locator.nearest(latitude, longitude, 3)]
+        assert found == pytest.approx(_brute_force(stations, latitude, longitude, 3)), (latitude, longitude)
+
+
+def test_nearest_across_the_antimeridian():
+    east = StationLocation("east", 50.0, 179.5)
+    west = StationLocation("west", 50.0, -150.0)
+    locator = StationLocator([east, west])
+    assert locator.nearest(50.0, -179.5)[0][0] is east
+
+
+def test_empty_and_count():
+    assert StationLocator([]).nearest(39.9, 116.4) == []
+    stations = _stations(5)
+    assert len(StationLocator(stations).nearest(39.9, 116.4, count=10)) == 5
+
+
+def test_load_stations_and_bulk_nearest(tmp_path):
+    path = tmp_path / "stations.csv"
+    path.write_text("code,latitude,longitude,name\n"
+                    "54511,39.8,116.47,北京\n"
+                    "# 注释\n"
+                    "58367,31.4,121.45,\n"
+                    "broken,north,east\n", encoding="utf-8")
+    stations = load_stations(path)
+    assert [(s.code, s.name) for s in stations] == [("54511", "北京"), ("58367", None)]
+    locator = StationLocator(stations)
+    assert locator.bulk_nearest([(40.0, 116.3), (31.2, 121.5)]) == ["54511", "58367"]
@@ -0,0 +1,75 @@
+"""Derived nowcast values from the observation and the hourly forecast."""
+import dataclasses
+import json
+from datetime import datetime, timedelta
+
+from homeassistant.components.weather import (
+    ATTR_FORECAST_NATIVE_TEMP,
+    ATTR_FORECAST_PRECIPITATION,
+    ATTR_FORECAST_TIME
+)
+
+from custom_components.nmc_weahter.model import MISSING, Observation, StationForecast
+from custom_components.nmc_weahter.nowcast import (
+    NOWCAST_APPARENT_TEMPERATURE,
+    NOWCAST_NEXT_RAIN,
+    NOWCAST_PRECIPITATION_TODAY,
+    NOWCAST_TEMPERATURE_TREND,
+    TREND_RISING,
+    apparent_temperature,
+    build_nowcast
+)
+from custom_components.nmc_weahter.scheduler import CHINA_TZ
+
+from . import load_fixture
+
+NOW = datetime(2026, 7, 1, 14, 30)
+
+
+def _forecast(**changes):
+    forecast = StationForecast.from_json(json.loads(load_fixture("weather.json"))["data"])
+    return dataclasses.replace(forecast, **changes)
+
+
+def _observed(hour, rain, day=0):
+    return Observation(time=datetime(2026, 7, 1, hour) + timedelta(days=day), temperature=25.0, pressure=1000.0,
+                       humidity=60.0, rain=rain, wind_speed=2.0, wind_direction=90.0)
+
+
+def _hourly(first, rain, temperature=30.0):
+    return [{ATTR_FORECAST_TIME: datetime(2026, 7, 1, first) + timedelta(hours=3 * i),
+             ATTR_FORECAST_PRECIPITATION: precipitation,
+             ATTR_FORECAST_NATIVE_TEMP: temperature}
+            for i, precipitation in enumerate(rain)]
+
+
+def test_precipitation_today_adds_observed_hours():
+    passed = (
+        _observed(23, 5.0, day=-1),  # 昨天的不算
+        _observed(8, 1.0),
+        _observed(13, 2.0),
+        _observed(14, None),
+    )
+    # 17、20、23时属于今天，次日2时不算
+    hourly = _hourly(17, [0.5, 0.0, 1.5, 9.0])
+    nowcast = build_nowcast(_forecast(passed=passed, temperature=25.0), hourly, NOW)
+    assert nowcast[NOWCAST_PRECIPITATION_TODAY] == 5.0
+    assert nowcast[NOWCAST_NEXT_RAIN] == datetime(2026, 7, 1, 17, tzinfo=CHINA_TZ)
+    assert nowcast[NOWCAST_TEMPERATURE_TREND] == TREND_RISING
+
+
+def test_precipitation_today_unknown_without_data():
+    nowcast = build_nowcast(_forecast(passed=()), [], NOW)
+    assert nowcast[NOWCAST_PRECIPITATION_TODAY] is None
+    assert nowcast[NOWCAST_NEXT_RAIN] is None
+
+
+def test_missing_observation():
+    # nmc.cn 以9999表示缺测
+    forecast = _forecast(passed=(), temperature=MISSING, humidity=60.0, wind_speed=2.0)
+    nowcast = build_nowcast(forecast, _hourly(17, [0.0]), NOW)
+    assert nowcast[NOWCAST_APPARENT_TEMPERATURE] is None
+    assert nowcast[NOWCAST_TEMPERATURE_TREND] is None
+    assert apparent_temperature(25.0, MISSING, 2.0) is None
+    assert apparent_temperature(25.0, 60.0, MISSING) is None
+    assert apparent_temperature(25.0, 60.0, 2.0) == 25.9
@@ -0,0 +1,113 @@
+"""The hourly forecast parser against the XPath path it replaced."""
+import re
+import timeit
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from lxml import html
+
+from homeassistant.components.weather import (
+    ATTR_FORECAST_HUMIDITY,
+    ATTR_FORECAST_NATIVE_PRESSURE,
+    ATTR_FORECAST_NATIVE_TEMP,
+    ATTR_FORECAST_NATIVE_WIND_SPEED,
+    ATTR_FORECAST_PRECIPITATION,
+    ATTR_FORECAST_TIME,
+    ATTR_FORECAST_WIND_BEARING
+)
+from homeassistant.util import dt as dt_util
+
+from custom_components.nmc_weahter.parser import get_value, parse_hourly_forecast
+
+from . import load_fixture
+
+
+def parse_hourly_xpath(tree):
+    """parse_hourly_forecast before precompiled XPath, kept as the baseline."""
+    forecast_data = OrderedDict()
+
+    for i in range(0, 7):
+        div_date = tree.xpath(
+            f'//*[@id="day7"]//div[contains(@class,"weather")][{i+1}]//div[contains(@class, "date")]')
+        if not len(div_date):
+            break
+        matches = re.findall(
+            r'\d+/\d+', div_date[0].text_content().strip())
+        if not matches:
+            break
+
+        now = dt_util.now(timezone(timedelta(hours=8)))
+
+        month_day = datetime.strptime(matches[0], "%m/%d") if i > 0 else now
+        predict_date = month_day.replace(year=now.year if month_day.month >= now.month else now.year + 1).date()
+
+        div_day = tree.xpath(f'//*[@id="day{i}"]')
+        if not len(div_day):
+            break
+        for div_hour in div_day[0].xpath("./div[contains(@class,'hour3')]"):
+            time_str = div_hour.xpath("./div[1]")[0].text_content().strip()
+            precipitation_str = div_hour.xpath(
+                "./div[3]")[0].text_content().strip()
+            temp_str = div_hour.xpath("./div[4]")[0].text_content().strip()
+            wind_speed_str = div_hour.xpath(
+                "./div[5]")[0].text_content().strip()
+            wind_bearing_str = div_hour.xpath(
+                "./div[6]")[0].text_content().strip()
+            pressure_str = div_hour.xpath(
+                "./div[7]")[0].text_content().strip()
+            humidity_str = div_hour.xpath(
+                "./div[8]")[0].text_content().strip()
+
+            predict = {}
+
+            if "日" in time_str:
+                day_str, time_str = time_str.split("日")
+                predict_date = predict_date + timedelta(days=1)
+                if predict_date.day != int(day_str):
+                    predict_date = predict_date.replace(day=int(day_str))
+            time = dt_util.parse_time(time_str)
+            predict[ATTR_FORECAST_TIME] = datetime.combine(
+                predict_date, time)
+
+            if "mm" in precipitation_str and (precipitation := get_value(precipitation_str)) is not None:
+                predict[ATTR_FORECAST_PRECIPITATION] = precipitation
+            if "℃" in temp_str and (temp := get_value(temp_str)) is not None:
+                predict[ATTR_FORECAST_NATIVE_TEMP] = temp
+            if "m/s" in wind_speed_str and (wind_speed := get_value(wind_speed_str)) is not None:
+                predict[ATTR_FORECAST_NATIVE_WIND_SPEED] = wind_speed
+            if (wind_bearing := get_value(wind_bearing_str)) is not None:
+                predict[ATTR_FORECAST_WIND_BEARING] = wind_bearing
+            if "hPa" in pressure_str and (pressure := get_value(pressure_str)) is not None:
+                predict[ATTR_FORECAST_NATIVE_PRESSURE] = pressure
+            if "%" in humidity_str and (humidity := get_value(humidity_str)) is not None:
+                predict[ATTR_FORECAST_HUMIDITY] = humidity
+
+            forecast_data[predict[ATTR_FORECAST_TIME]] = predict
+
+    return list(forecast_data.values())
+
+
+@pytest.fixture(scope="module")
+def tree():
+    return html.document_fromstring(load_fixture("station.html"))
+
+
+def test_same_output(tree):
+    assert parse_hourly_forecast(tree) == parse_hourly_xpath(tree)
+
+
+@pytest.mark.benchmark(group="parse_hourly")
+def test_benchmark_xpath(benchmark, tree):
+    benchmark(parse_hourly_xpath, tree)
+
+
+@pytest.mark.benchmark(group="parse_hourly")
+def test_benchmark_precompiled(benchmark, tree):
+    benchmark(parse_hourly_forecast, tree)
+
+
+def test_faster_than_xpath(tree):
+    old = min(timeit.repeat(lambda: parse_hourly_xpath(tree), number=20, repeat=5))
+    new = min(timeit.repeat(lambda: parse_hourly_forecast(tree), number=20, repeat=5))
+    assert new < old / 1.5, f"{new / 20 * 1000:.2f}ms vs {old / 20 * 1000:.2f}ms with XPath"
@@ -0,0 +1,76 @@
+"""The radar ring buffer and the GIF spliced from its frames."""
+import io
+import random
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageSequence
+
+from custom_components.nmc_weahter.radar import FRAME_DURATION, LAST_FRAME_DURATION, RadarLoop
+
+START = datetime(2026, 7, 1, 8, 0)
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255)]
+
+
+def _png(color=None, size=(64, 48), seed=0):
+    if color is None:
+        # 随机噪声几乎无法压缩，用于测试内存上限
+        rng = random.Random(seed)
+        image = Image.frombytes("RGB", size, bytes(rng.getrandbits(8) for _ in range(size[0] * size[1] * 3)))
+    else:
+        image = Image.new("RGB", size, color)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _frames(animation):
+    with Image.open(io.BytesIO(animation)) as image:
+        assert image.info.get("loop") == 0
+        return [(frame.convert("RGB").getpixel((0, 0)), frame.info["duration"])
+                for frame in ImageSequence.Iterator(image)]
+
+
+def test_ring_buffer_rollover():
+    loop = RadarLoop(max_frames=3, max_bytes=1024 * 1024)
+    for i, color in enumerate(COLORS):
+        animation = loop.add_frame(START + timedelta(minutes=6 * i), _png(color))
+
+    assert len(loop) == 3
+    assert loop.last_update == START + timedelta(minutes=24)
+    assert animation is loop.animation
+    # 只留下最新的三帧，最后一帧停留更久
+    assert _frames(animation) == [(COLORS[2], FRAME_DURATION), (COLORS[3], FRAME_DURATION),
+                                  (COLORS[4], LAST_FRAME_DURATION)]
+
+
+def test_frames_of_different_sizes():
+    loop = RadarLoop(max_frames=5, max_bytes=1024 * 1024)
+    loop.add_frame(START, _png(COLORS[0], size=(32, 32)))
+    loop.add_frame(START + timedelta(minutes=6), _png(COLORS[1], size=(64, 48)))
+    with Image.open(io.BytesIO(loop.animation)) as image:
+        assert image.size == (64, 48)
+    assert [color for color, _ in _frames(loop.animation)] == COLORS[:2]
+
+
+def test_memory_ceiling():
+    frame = _png(size=(64, 64))
+    single = RadarLoop(max_frames=10, max_bytes=1024 * 1024)
+    single.add_frame(START, frame)
+    # 约能容纳三帧及其拼接出的动画
+    max_bytes = single.size * 3
+    loop = RadarLoop(max_frames=10, max_bytes=max_bytes)
+    for i in range(10):
+        loop.add_frame(START + timedelta(minutes=6 * i), _png(size=(64, 64), seed=i))
+        assert loop.size <= max_bytes
+    assert 1 < len(loop) < 10
+    assert loop.last_update == START + timedelta(minutes=54)
+    assert len(_frames(loop.animation)) == len(loop)
+
+
+def test_single_frame_over_ceiling_is_kept():
+    loop = RadarLoop(max_frames=10, max_bytes=100)
+    loop.add_frame(START, _png(size=(64, 64)))
+    loop.add_frame(START + timedelta(minutes=6), _png(size=(64, 64), seed=1))
+    # 总要有一帧可以显示
+    assert len(loop) == 1
+    assert loop.last_update == START + timedelta(minutes=6)
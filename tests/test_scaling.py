@@ -0,0 +1,110 @@
+"""Many stations share one refresh timer and cost about the same each."""
+import asyncio
+import gc
+import time
+import tracemalloc
+from collections import Counter
+from datetime import timedelta
+
+from homeassistant.const import CONF_NAME
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.nmc_weahter.const import CONF_STATION_CODE, DOMAIN
+from custom_components.nmc_weahter.hub import async_get_hub
+
+BATCHES = (5, 20)
+MAX_STATION_MS = 100
+MAX_STATION_BYTES = 1024 * 1024
+
+
+async def _async_setup_stations(hass, first, count):
+    for i in range(first, first + count):
+        code = f"{54000 + i:05d}"
+        entry = MockConfigEntry(
+            domain=DOMAIN, unique_id=code, title=code,
+            data={CONF_NAME: code, CONF_STATION_CODE: code})
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_stations_scale(hass, nmc_server, no_rate_limit):
+    hub = async_get_hub(hass)
+    # 第一个站点承担共享部分：hub、平台和各模块的首次加载
+    await _async_setup_stations(hass, 0, 1)
+
+    first = 1
+    setup_ms = []
+    requests = []
+    for count in BATCHES:
+        before = Counter(nmc_server.requests)
+        start = time.perf_counter()
+        await _async_setup_stations(hass, first, count)
+        setup_ms.append((time.perf_counter() - start) / count * 1000)
+        requests.append((nmc_server.requests - before).total() / count)
+        first += count
+
+    # 内存单独测量，tracemalloc会明显拖慢启动
+    retained_bytes = []
+    for count in BATCHES:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            await _async_setup_stations(hass, first, count)
+            gc.collect()
+            retained_bytes.append(tracemalloc.get_traced_memory()[0] / count)
+        finally:
+            tracemalloc.stop()
+        first += count
+
+    stations = first
+    assert len(hass.data[DOMAIN]) == stations
+    # 每个站点都交给共享调度器，没有自己的定时器
+    assert len(hub.scheduler) == stations
+    assert all(c.update_interval is None for c in hass.data[DOMAIN].values())
+
+    for ms, retained in zip(setup_ms, retained_bytes):
+        assert ms < MAX_STATION_MS, f"setup takes {ms:.1f}ms per station"
+        assert retained < MAX_STATION_BYTES, f"{retained / 1024:.0f}KB per station"
+    # 站点增加四倍，每个站点的请求数和内存不应增长
+    assert requests[1] <= requests[0]
+    assert retained_bytes[1] < retained_bytes[0] * 1.5
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    assert len(hub.scheduler) == 0
+
+
+async def test_shared_timer_refreshes_stations(hass, nmc_server, no_rate_limit):
+    await _async_setup_stations(hass, 0, 3)
+    coordinators = list(hass.data[DOMAIN].values())
+    assert all(c.stats.refresh.count == 1 for c in coordinators)
+
+    # 缩短到期时间，让共享定时器在真实时间内依次唤醒各站点
+    intervals = {}
+    for i, coordinator in enumerate(coordinators):
+        coordinator.refresh_interval = timedelta(milliseconds=20 * (i + 1))
+        intervals[coordinator.station_code] = coordinator.refresh_interval.total_seconds()
+    scheduled = hass.loop.time()
+    log_start = len(nmc_server.log)
+    for coordinator in coordinators:
+        # 产品都到期，定时刷新才会发出请求
+        coordinator.async_expire()
+        coordinator.async_schedule_refresh()
+    await asyncio.sleep(0.1)
+    await hass.async_block_till_done()
+
+    # 每个站点的第一次定时请求不早于各自的间隔，并按到期先后发出
+    first_request = {}
+    for path, at in nmc_server.log[log_start:]:
+        if path.startswith("/rest/weather?stationid="):
+            first_request.setdefault(path.rsplit("=", 1)[1], at)
+    assert set(first_request) == set(intervals)
+    for code, at in first_request.items():
+        # 事件循环可能按时钟精度稍早唤醒
+        assert at - scheduled >= intervals[code] - 0.005
+    assert sorted(first_request, key=first_request.get) == sorted(intervals, key=intervals.get)
+    assert all(c.stats.refresh.count >= 2 for c in coordinators)
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,117 @@
+"""Learned product cadence and the shared refresh timer."""
+import asyncio
+from datetime import datetime, timedelta
+
+from custom_components.nmc_weahter.scheduler import (
+    LEARNING_RATE,
+    MAX_BACKOFF,
+    MIN_INTERVAL,
+    PUBLISH_DELAY,
+    ProductSchedule,
+    RefreshScheduler
+)
+
+PUBLISHED = datetime(2026, 7, 1, 8, 0)
+
+
+def test_poll_after_expected_publication():
+    schedule = ProductSchedule(timedelta(hours=1))
+    assert schedule.due(PUBLISHED)
+    schedule.record(PUBLISHED, PUBLISHED + timedelta(minutes=5))
+    expected = PUBLISHED + timedelta(hours=1) + PUBLISH_DELAY
+    assert schedule.next_poll == expected
+    assert not schedule.due(expected - timedelta(seconds=1))
+    assert schedule.due(expected)
+
+
+def test_learn_cadence():
+    schedule = ProductSchedule(timedelta(hours=1))
+    schedule.record(PUBLISHED, PUBLISHED)
+    schedule.record(PUBLISHED + timedelta(minutes=40), PUBLISHED + timedelta(minutes=45))
+    interval = timedelta(hours=1) + (timedelta(minutes=40) - timedelta(hours=1)) * LEARNING_RATE
+    assert schedule.interval == interval
+    assert schedule.next_poll == PUBLISHED + timedelta(minutes=40) + interval + PUBLISH_DELAY
+
+    # 超出合理范围的间隔（例如停更一天以上）不参与学习
+    schedule.record(PUBLISHED + timedelta(days=2), PUBLISHED + timedelta(days=2))
+    assert schedule.interval == interval
+
+
+def test_back_off_while_nothing_new():
+    schedule = ProductSchedule(timedelta(hours=1))
+    now = PUBLISHED + timedelta(minutes=5)
+    schedule.record(PUBLISHED, now)
+    delays = []
+    for _ in range(7):
+        now = schedule.next_poll
+        schedule.record(PUBLISHED, now)
+        delays.append(schedule.next_poll - now)
+    assert delays == [MIN_INTERVAL * 2 ** i for i in range(4)] + [MAX_BACKOFF] * 3
+
+    # 新发布后恢复按间隔轮询
+    schedule.record(PUBLISHED + timedelta(hours=1), now)
+    assert schedule.next_poll - now <= schedule.interval
+
+
+def test_late_publication_counts_as_miss():
+    schedule = ProductSchedule(timedelta(hours=1))
+    now = PUBLISHED + timedelta(hours=2)
+    schedule.record(PUBLISHED, now)
+    # 预计的下一次发布已经过去，很快再查
+    assert schedule.next_poll == now + MIN_INTERVAL
+
+
+def test_back_off_on_failures():
+    schedule = ProductSchedule(timedelta(hours=1))
+    now = PUBLISHED
+    delays = []
+    for _ in range(6):
+        schedule.record_failure(now)
+        delays.append(schedule.next_poll - now)
+    assert delays == [MIN_INTERVAL * 2 ** i for i in range(4)] + [MAX_BACKOFF] * 2
+    schedule.record(PUBLISHED, now)
+    schedule.record_failure(now)
+    assert schedule.next_poll == now + MIN_INTERVAL
+
+
+async def test_refresh_scheduler_runs_in_order(hass):
+    scheduler = RefreshScheduler(hass)
+    ran = []
+
+    def action(name):
+        async def run():
+            ran.append(name)
+        return run
+
+    scheduler.async_schedule(0.03, action("third"))
+    scheduler.async_schedule(0.01, action("first"))
+    cancel = scheduler.async_schedule(0.015, action("cancelled"))
+    scheduler.async_schedule(0.02, action("second"))
+    assert len(scheduler) == 4
+    cancel()
+    assert len(scheduler) == 3
+
+    await asyncio.sleep(0.05)
+    await hass.async_block_till_done()
+    assert ran == ["first", "second", "third"]
+    assert len(scheduler) == 0
+
+
+async def test_refresh_scheduler_earlier_action_rearms(hass):
+    scheduler = RefreshScheduler(hass)
+    ran = []
+
+    async def late():
+        ran.append("late")
+
+    async def early():
+        ran.append("early")
+
+    cancel_late = scheduler.async_schedule(10, late)
+    scheduler.async_schedule(0.01, early)
+    await asyncio.sleep(0.03)
+    await hass.async_block_till_done()
+    assert ran == ["early"]
+    assert len(scheduler) == 1
+    cancel_late()
+    assert len(scheduler) == 0
@@ -0,0 +1,30 @@
+"""Sensors of a station set up from a config entry."""
+import pytest
+
+from homeassistant.const import CONF_NAME
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.nmc_weahter.const import CONF_STATION_CODE, DOMAIN
+
+
+async def test_diagnostic_sensor_follows_every_refresh(hass, nmc_server):
+    entry = MockConfigEntry(domain=DOMAIN, unique_id="54511", title="54511",
+                            data={CONF_NAME: "54511", CONF_STATION_CODE: "54511"})
+    entry.add_to_hass(hass)
+    registry = er.async_get(hass)
+    entity_id = registry.async_get_or_create(
+        "sensor", DOMAIN, "nmc-54511-diagnostic-refresh_duration",
+        config_entry=entry, suggested_object_id="refresh_duration").entity_id
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    coordinator.stats.refresh.record(1234.0)
+    # 数据没有变化，统计数据仍然随刷新更新
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.stats.refresh.last != 1234.0
+    assert float(hass.states.get(entity_id).state) == pytest.approx(coordinator.stats.refresh.last)
+
+    assert await hass.config_entries.async_unload(entry.entry_id)